@@ -38,11 +38,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'rest_framework_simplejwt',
     'django_filters',
 
+    'core',
     'product',
     'user'
 ]
@@ -55,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'ananas.urls'
@@ -118,10 +121,14 @@ DATABASES = {
 
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        "BACKEND": "core.cache_backends.TwoTierRedisCache",
         "LOCATION": "redis://127.0.0.1:6379/1",
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # in-process tier for the hottest keys, invalidated over pub/sub
+            "LOCAL_KEY_PREFIXES": ["product:", "vendor:"],
+            "LOCAL_MAX_ENTRIES": 2048,
+            "LOCAL_TIMEOUT": 5,
         }
     }
 }
@@ -174,3 +181,111 @@ CHECKOUT_FAILED_URL = 'http://localhost:3000/checkout/failed/'
 
 REDIS_HOST = 'localhost'
 REDIS_PORT = 6379
+
+CATEGORY_CACHE_POLL_INTERVAL = 1.0
+
+PRODUCT_PRICE_FACET_BUCKETS = [1000, 5000, 10000, 50000]
+PRODUCT_PRICE_FACET_MAX_BUCKETS = 20
+PRODUCT_FACETS_CACHE_TIMEOUT = 60
+
+# Serve the hot read endpoints with native async views (enabled by ananas/asgi.py)
+ASYNC_READ_VIEWS = os.environ.get('ANANAS_ASYNC_VIEWS') == '1'
+
+PRODUCT_DETAIL_CACHE_TIMEOUT = 60 * 15
+
+# Background jobs (core.queue); run them with `manage.py runworker`
+JOBS_ALWAYS_EAGER = False
+JOBS_CONCURRENCY = 4
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BACKOFF = 2.0
+JOBS_RETRY_BACKOFF_MAX = 600.0
+JOBS_STALE_TIMEOUT = 3600
+JOBS_KEEP_FINISHED = 86400
+
+DASHBOARD_CACHE_TIMEOUT = 60 * 5
+VENDOR_DETAIL_CACHE_TIMEOUT = 60 * 15
+HOT_KEYS_SAMPLE_RATE = 0.1
+# How long an expired entry may still be served while one request recomputes it
+CACHE_STALE_TIMEOUT = 60
+VENDOR_PRODUCTS_PAGE_SIZE = 20
+
+# Soft-deleted products/vendors are removed by the purge_deleted_rows job
+PURGE_BATCH_SIZE = 500
+PURGE_BATCH_PAUSE = 0.1
+
+# Token buckets for core.throttling.TokenBucketThrottle, per view throttle_scope.
+# capacity is the burst size, refill_rate the sustained requests per second.
+THROTTLE_BUCKETS = {
+    'product_dashboard': {
+        'anon': {'capacity': 10, 'refill_rate': 0.5},
+        'user': {'capacity': 30, 'refill_rate': 2},
+    },
+    'user_dashboard': {
+        'anon': {'capacity': 10, 'refill_rate': 0.5},
+        'user': {'capacity': 30, 'refill_rate': 2},
+    },
+    'comment_activity': {
+        'anon': {'capacity': 10, 'refill_rate': 0.5},
+        'user': {'capacity': 30, 'refill_rate': 2},
+    },
+    'checkout': {
+        'anon': {'capacity': 5, 'refill_rate': 0.1},
+        'user': {'capacity': 10, 'refill_rate': 0.5},
+    },
+    'comments': {
+        'anon': {'capacity': 20, 'refill_rate': 1},
+        'user': {'capacity': 60, 'refill_rate': 5},
+    },
+}
+
+# Precompressed catalog shards, rebuilt by `manage.py build_catalog_snapshot`
+CATALOG_SNAPSHOT_DIR = BASE_DIR / 'var' / 'catalog'
+CATALOG_SNAPSHOT_PAGE_SIZE = 100
+CATALOG_SNAPSHOT_MAX_AGE = 60
+
+# Product change feed (/api/product/changes/)
+PRODUCT_CHANGES_BATCH = 500
+PRODUCT_CHANGES_COMPACT_BATCH = 1000
+PRODUCT_CHANGES_RETENTION = 60 * 60 * 24 * 30
+
+# Cached cart totals, dropped whenever the cart or one of its products changes
+CART_SUMMARY_CACHE_TIMEOUT = 60 * 10
+
+# Product name autocomplete (/api/product/suggest/), rebuilt by `manage.py rebuild_autocomplete`
+AUTOCOMPLETE_KEY_PREFIX = 'autocomplete'
+AUTOCOMPLETE_MAX_PREFIX = 20
+AUTOCOMPLETE_PREFIX_LIMIT = 50
+AUTOCOMPLETE_LIMIT = 10
+
+# "Frequently carted together" (product.recommendations), refreshed by `manage.py build_recommendations`
+RECOMMENDATIONS_STATE = BASE_DIR / 'var' / 'recommendations.npz'
+RECOMMENDATIONS_TOP_K = 20
+# Overlap between runs, covering carts written in transactions still open when a run reads
+RECOMMENDATIONS_LAG = 300
+
+# Per-request profiles (core.profiling), for requests with a signed X-Profile
+# header (`manage.py profile_report --token`) or a PROFILE_SAMPLE_RATE share
+PROFILE_DIR = BASE_DIR / 'var' / 'profiles'
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_MAX_ARTIFACTS = 500
+PROFILE_MAX_QUERIES = 20
+
+# Cold start budget in seconds, checked by `manage.py bench_startup`
+STARTUP_BUDGET = 3.0
+
+# Local Stripe Product/Price mapping (product.payments), synced by the sync_stripe_products job
+STRIPE_SYNC_BATCH = 100
+STRIPE_SYNC_DELAY = 5
+STRIPE_PRICE_CACHE_TIMEOUT = 60 * 60
+
+# Stripe API endpoint override, e.g. the local `manage.py run_fake_stripe` server for load tests
+STRIPE_API_BASE = os.environ.get('ANANAS_STRIPE_API_BASE')
+
+# Monthly Comment partitions (product.partitions), managed by `manage.py create_comment_partitions`
+# and `manage.py archive_comment_partitions`; product detail reads cover COMMENT_RECENT_MONTHS unless ?history=1
+COMMENT_PARTITIONS_AHEAD = 3
+COMMENT_RECENT_MONTHS = 12
+COMMENT_ARCHIVE_MONTHS = 36
+COMMENT_ARCHIVE_DIR = BASE_DIR / 'var' / 'comment-archive'
+COMMENT_DETACH_LOCK_TIMEOUT = '5s'
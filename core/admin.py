@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'queue', 'status', 'attempts', 'run_at', 'finished_at']
+    list_filter = ['queue', 'status']
+
+
+admin.site.register(Job, JobAdmin)
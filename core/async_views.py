@@ -0,0 +1,44 @@
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, permissions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+class AsyncAPIView(View):
+    # Read-only counterpart of APIView for the ASGI stack. Handlers are
+    # coroutines; only authentication still runs in a worker thread.
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = [permissions.AllowAny]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def response(self, data, status=200):
+        return JsonResponse(data, status=status, safe=False, encoder=DjangoJSONEncoder)
+
+    def check_permissions(self, request):
+        drf_request = Request(request, authenticators=[auth() for auth in self.authentication_classes])
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(drf_request, self):
+                if drf_request._authenticator is None and drf_request.authenticators:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+        request.user = drf_request.user
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return self.response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        try:
+            if self.permission_classes != [permissions.AllowAny]:
+                await sync_to_async(self.check_permissions)(request)
+            return await handler(request, *args, **kwargs)
+        except Http404:
+            return self.response({'detail': 'Not found.'}, status=404)
+        except exceptions.APIException as exc:
+            return self.response({'detail': exc.detail}, status=exc.status_code)
@@ -0,0 +1,176 @@
+import asyncio
+import math
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+
+def _redis():
+    try:
+        return get_redis_connection('default')
+    except NotImplementedError:
+        return None
+
+
+# Deletes the lock only while it still holds our token, in one round trip.
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _release_lock(lock_key, token):
+    connection = _redis()
+    if connection is None:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+        return
+    connection.eval(_RELEASE_LOCK, 1, cache.client.make_key(lock_key), cache.client.encode(token))
+
+
+def _hot_key(kind, day):
+    return f'hot:{kind}:{day:%Y%m%d}'
+
+
+def _sampled():
+    return random.random() < getattr(settings, 'HOT_KEYS_SAMPLE_RATE', 0.1)
+
+
+def _record_access(kind, object_id):
+    connection = _redis()
+    if connection is None:
+        return
+    key = _hot_key(kind, timezone.now())
+    pipeline = connection.pipeline(transaction=False)
+    pipeline.zincrby(key, 1, object_id)
+    pipeline.expire(key, 60 * 60 * 24 * 2)
+    pipeline.execute()
+
+
+def record_access(kind, object_id):
+    # Sampled per-day access counters used to pick hot keys for warm-up.
+    if _sampled():
+        _record_access(kind, object_id)
+
+
+async def arecord_access(kind, object_id):
+    if _sampled():
+        await sync_to_async(_record_access)(kind, object_id)
+
+
+def hot_ids(kind, limit):
+    connection = _redis()
+    if connection is None:
+        return []
+    today = timezone.now()
+    keys = [_hot_key(kind, today), _hot_key(kind, today - timedelta(days=1))]
+    pipeline = connection.pipeline(transaction=False)
+    for key in keys:
+        pipeline.zrevrange(key, 0, limit - 1, withscores=True)
+    scores = {}
+    for rows in pipeline.execute():
+        for member, score in rows:
+            scores[int(member)] = scores.get(int(member), 0) + score
+    return sorted(scores, key=lambda object_id: -scores[object_id])[:limit]
+
+
+def _envelope(value, timeout, delta):
+    return {'value': value, 'expires': time.time() + timeout, 'delta': delta}
+
+
+def _is_fresh(entry, beta):
+    # Probabilistic early expiration (XFetch): the closer an entry gets to its
+    # soft expiry, and the slower it was to compute, the likelier a reader
+    # refreshes it early, so expiries of hot keys do not line up.
+    early = entry['delta'] * beta * -math.log(1.0 - random.random())
+    return time.time() + early < entry['expires']
+
+
+def _stale_timeout(timeout, stale_timeout):
+    if stale_timeout is None:
+        stale_timeout = getattr(settings, 'CACHE_STALE_TIMEOUT', timeout)
+    return timeout + stale_timeout
+
+
+def store(key, value, timeout, stale_timeout=None, delta=0.0):
+    cache.set(key, _envelope(value, timeout, delta), _stale_timeout(timeout, stale_timeout))
+
+
+def _recompute(key, compute, timeout, stale_timeout):
+    started = time.perf_counter()
+    value = compute()
+    store(key, value, timeout, stale_timeout, time.perf_counter() - started)
+    return value
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=None, beta=1.0, lock_timeout=30, wait_timeout=5.0):
+    # Serve `key` from the cache, recomputing it in at most one process at a
+    # time. Entries stay fresh for `timeout` seconds and may be served stale
+    # for another `stale_timeout` seconds while one request refreshes them.
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry, beta):
+        return entry['value']
+
+    lock_key = f'lock:{key}'
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, lock_timeout):
+        try:
+            return _recompute(key, compute, timeout, stale_timeout)
+        finally:
+            _release_lock(lock_key, token)
+    if entry is not None:
+        return entry['value']
+
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value']
+        if cache.get(lock_key) is None:
+            break
+    return compute()
+
+
+async def aget_or_compute(key, compute, timeout, stale_timeout=None, beta=1.0, lock_timeout=30, wait_timeout=5.0):
+    # Async variant of get_or_compute; `compute` is a coroutine function.
+    entry = await cache.aget(key)
+    if entry is not None and _is_fresh(entry, beta):
+        return entry['value']
+
+    lock_key = f'lock:{key}'
+    token = uuid.uuid4().hex
+    if await cache.aadd(lock_key, token, lock_timeout):
+        try:
+            started = time.perf_counter()
+            value = await compute()
+            delta = time.perf_counter() - started
+            await cache.aset(key, _envelope(value, timeout, delta), _stale_timeout(timeout, stale_timeout))
+            return value
+        finally:
+            if _redis() is None:
+                if await cache.aget(lock_key) == token:
+                    await cache.adelete(lock_key)
+            else:
+                await sync_to_async(_release_lock)(lock_key, token)
+    if entry is not None:
+        return entry['value']
+
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        entry = await cache.aget(key)
+        if entry is not None:
+            return entry['value']
+        if await cache.aget(lock_key) is None:
+            break
+    return await compute()
@@ -0,0 +1,252 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django_redis.cache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TwoTierRedisCache(RedisCache):
+    # django_redis RedisCache with a bounded per-process LRU in front of it.
+    # Only keys under LOCAL_KEY_PREFIXES are kept locally, for at most
+    # LOCAL_TIMEOUT seconds; every write publishes the changed keys so the
+    # other processes drop their copies. Locally cached values are shared
+    # objects and must be treated as read-only by callers.
+
+    def __init__(self, server, params):
+        options = dict(params.get('OPTIONS', {}))
+        self._local_max_entries = options.pop('LOCAL_MAX_ENTRIES', 1024)
+        self._local_timeout = options.pop('LOCAL_TIMEOUT', 5)
+        self._local_prefixes = tuple(options.pop('LOCAL_KEY_PREFIXES', ()))
+        self._channel = options.pop('INVALIDATION_CHANNEL', 'cache:invalidate')
+        self._stats_key = options.pop('STATS_KEY', 'cache:stats')
+        super().__init__(server, {**params, 'OPTIONS': options})
+
+        self._local = OrderedDict()
+        self._local_lock = threading.Lock()
+        self._origin = uuid.uuid4().hex
+        self._listener_pid = None
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._stats_flushed_at = time.monotonic()
+
+    # local tier
+
+    def _local_key(self, key, version):
+        if self._local_prefixes and not str(key).startswith(self._local_prefixes):
+            return None
+        return self.make_key(key, version=version)
+
+    def _local_get(self, local_key):
+        with self._local_lock:
+            entry = self._local.get(local_key)
+            if entry is None:
+                return _MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._local[local_key]
+                return _MISSING
+            self._local.move_to_end(local_key)
+            return value
+
+    def _local_set(self, local_key, value):
+        with self._local_lock:
+            self._local[local_key] = (time.monotonic() + self._local_timeout, value)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_discard(self, local_keys):
+        with self._local_lock:
+            for local_key in local_keys:
+                self._local.pop(local_key, None)
+
+    def _local_clear(self):
+        with self._local_lock:
+            self._local.clear()
+
+    # invalidation
+
+    def _ensure_listener(self):
+        if self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        self._local_clear()
+        thread = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+        thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.get_client(write=False).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                for message in pubsub.listen():
+                    payload = json.loads(message['data'])
+                    if payload['origin'] == self._origin:
+                        continue
+                    if payload['keys'] == '*':
+                        self._local_clear()
+                    else:
+                        self._local_discard(payload['keys'])
+            except Exception:
+                logger.warning('Cache invalidation listener disconnected', exc_info=True)
+                # Messages may have been missed while disconnected.
+                self._local_clear()
+                time.sleep(1)
+
+    def _publish(self, local_keys):
+        if local_keys != '*':
+            local_keys = [local_key for local_key in local_keys if local_key is not None]
+            if not local_keys:
+                return
+        try:
+            self.client.get_client(write=True).publish(
+                self._channel, json.dumps({'origin': self._origin, 'keys': local_keys}),
+            )
+        except Exception:
+            logger.warning('Could not publish cache invalidation', exc_info=True)
+
+    def _invalidate(self, keys, version=None):
+        local_keys = [self._local_key(key, version) for key in keys]
+        self._local_discard([local_key for local_key in local_keys if local_key is not None])
+        self._publish(local_keys)
+
+    # statistics
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+        if time.monotonic() - self._stats_flushed_at > 10:
+            self.flush_stats()
+
+    def flush_stats(self):
+        with self._stats_lock:
+            stats, self._stats = self._stats, Counter()
+            self._stats_flushed_at = time.monotonic()
+        if not stats:
+            return
+        try:
+            pipeline = self.client.get_client(write=True).pipeline(transaction=False)
+            for name, amount in stats.items():
+                pipeline.hincrby(self._stats_key, name, amount)
+            pipeline.execute()
+        except Exception:
+            logger.warning('Could not flush cache statistics', exc_info=True)
+
+    def tier_stats(self):
+        raw = self.client.get_client(write=False).hgetall(self._stats_key)
+        stats = Counter({name.decode(): int(value) for name, value in raw.items()})
+        stats.update(self._stats)
+        local_lookups = stats['local_hits'] + stats['local_misses']
+        lookups = stats['local_hits'] + stats['remote_hits'] + stats['remote_misses']
+        return {
+            'local_hits': stats['local_hits'],
+            'local_misses': stats['local_misses'],
+            'remote_hits': stats['remote_hits'],
+            'remote_misses': stats['remote_misses'],
+            'local_hit_ratio': stats['local_hits'] / local_lookups if local_lookups else 0.0,
+            'remote_hit_ratio': stats['remote_hits'] / (stats['remote_hits'] + stats['remote_misses'])
+            if stats['remote_hits'] + stats['remote_misses'] else 0.0,
+            'overall_hit_ratio': (stats['local_hits'] + stats['remote_hits']) / lookups if lookups else 0.0,
+            'local_entries': len(self._local),
+        }
+
+    # cache API
+
+    def get(self, key, default=None, version=None, client=None):
+        self._ensure_listener()
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            value = self._local_get(local_key)
+            if value is not _MISSING:
+                self._count('local_hits')
+                return value
+            self._count('local_misses')
+        value = super().get(key, default=_MISSING, version=version, client=client)
+        if value is _MISSING:
+            self._count('remote_misses')
+            return default
+        self._count('remote_hits')
+        if local_key is not None:
+            self._local_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        self._ensure_listener()
+        found, remote_keys = {}, []
+        for key in keys:
+            local_key = self._local_key(key, version)
+            value = self._local_get(local_key) if local_key is not None else _MISSING
+            if value is _MISSING:
+                remote_keys.append(key)
+                if local_key is not None:
+                    self._count('local_misses')
+            else:
+                found[key] = value
+                self._count('local_hits')
+        if remote_keys:
+            remote = super().get_many(remote_keys, version=version, client=client)
+            self._count('remote_hits', len(remote))
+            self._count('remote_misses', len(remote_keys) - len(remote))
+            for key, value in remote.items():
+                local_key = self._local_key(key, version)
+                if local_key is not None:
+                    self._local_set(local_key, value)
+            found.update(remote)
+        return found
+
+    def set(self, key, value, *args, **kwargs):
+        result = super().set(key, value, *args, **kwargs)
+        self._invalidate([key], kwargs.get('version', args[1] if len(args) > 1 else None))
+        return result
+
+    def add(self, key, value, *args, **kwargs):
+        result = super().add(key, value, *args, **kwargs)
+        if result:
+            self._invalidate([key], kwargs.get('version', args[1] if len(args) > 1 else None))
+        return result
+
+    def set_many(self, data, *args, **kwargs):
+        result = super().set_many(data, *args, **kwargs)
+        self._invalidate(list(data), kwargs.get('version', args[1] if len(args) > 1 else None))
+        return result
+
+    def delete(self, key, version=None, *args, **kwargs):
+        result = super().delete(key, version, *args, **kwargs)
+        self._invalidate([key], version)
+        return result
+
+    def delete_many(self, keys, version=None, *args, **kwargs):
+        keys = list(keys)
+        result = super().delete_many(keys, version, *args, **kwargs)
+        self._invalidate(keys, version)
+        return result
+
+    def incr(self, key, delta=1, version=None, *args, **kwargs):
+        result = super().incr(key, delta, version, *args, **kwargs)
+        self._invalidate([key], version)
+        return result
+
+    def decr(self, key, delta=1, version=None, *args, **kwargs):
+        result = super().decr(key, delta, version, *args, **kwargs)
+        self._invalidate([key], version)
+        return result
+
+    def delete_pattern(self, *args, **kwargs):
+        result = super().delete_pattern(*args, **kwargs)
+        self._local_clear()
+        self._publish('*')
+        return result
+
+    def clear(self):
+        result = super().clear()
+        self._local_clear()
+        self._publish('*')
+        return result
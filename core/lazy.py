@@ -0,0 +1,37 @@
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+def lazy_view(path, asynchronous=False, csrf_exempt=True, **initkwargs):
+    # URLconf entry for the class based view at `path` that imports its module
+    # on the first request instead of when the URLconf loads. DRF views are
+    # csrf_exempt, and CsrfViewMiddleware checks that before the view is
+    # imported, so the wrapper is marked up front; plain Django views pass
+    # csrf_exempt=False. Async views need asynchronous=True so Django calls
+    # the wrapper as a coroutine.
+    lock = threading.Lock()
+    resolved = []
+
+    def get_view():
+        if not resolved:
+            with lock:
+                if not resolved:
+                    view = import_string(path).as_view(**initkwargs)
+                    if getattr(view, 'csrf_exempt', False) != csrf_exempt:
+                        raise ImproperlyConfigured(f'{path} is not marked with csrf_exempt={csrf_exempt}')
+                    sync_view.view_class = async_view.view_class = view.view_class
+                    resolved.append(view)
+        return resolved[0]
+
+    def sync_view(request, *args, **kwargs):
+        return get_view()(request, *args, **kwargs)
+
+    async def async_view(request, *args, **kwargs):
+        return await get_view()(request, *args, **kwargs)
+
+    view = async_view if asynchronous else sync_view
+    view.csrf_exempt = csrf_exempt
+    view.lazy_path = path
+    return view
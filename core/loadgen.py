@@ -0,0 +1,160 @@
+import asyncio
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+
+class LoadResult:
+
+    def __init__(self, latencies, errors, elapsed, statuses=None):
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+        self.statuses = Counter(statuses or ())
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, value):
+        if not self.latencies:
+            return 0.0
+        index = min(len(self.latencies) - 1, int(round(value / 100 * (len(self.latencies) - 1))))
+        return self.latencies[index]
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'seconds': round(self.elapsed, 3),
+            'rps': round(self.throughput, 1),
+            'mean_ms': round(statistics.fmean(self.latencies) * 1000, 2) if self.latencies else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+        }
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        body = b''
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).strip().split(b';')[0], 16)
+            chunk = await reader.readexactly(size + 2)
+            if size == 0:
+                break
+            body += chunk[:-2]
+    else:
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, body
+
+
+def build_request(method, url, body=b'', headers=None):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: keep-alive']
+    for name, value in (headers or {}).items():
+        lines.append(f'{name}: {value}')
+    if body or method in ('POST', 'PUT', 'PATCH'):
+        lines.append(f'Content-Length: {len(body)}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+async def _connection(url, queue, latencies, errors, statuses):
+    parts = urlsplit(url)
+    reader = writer = None
+    while True:
+        try:
+            request = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        method, target, body, headers = request
+        payload = build_request(method, target, body, headers)
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            writer.write(payload)
+            await writer.drain()
+            status, response_headers, _ = await _read_response(reader)
+            statuses.append(status)
+            if status >= 500:
+                errors.append(status)
+            else:
+                latencies.append(time.perf_counter() - started)
+            if response_headers.get('connection', '').lower() == 'close':
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            errors.append(exc)
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url, total, concurrency, method='GET', body=b'', headers=None, request_factory=None):
+    # Each of the `concurrency` keep-alive connections pulls requests from a
+    # shared queue until `total` requests have been issued.
+    queue = asyncio.Queue()
+    for index in range(total):
+        if request_factory is not None:
+            queue.put_nowait(request_factory(index))
+        else:
+            queue.put_nowait((method, url, body, headers))
+    latencies, errors, statuses = [], [], []
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _connection(url, queue, latencies, errors, statuses) for _ in range(concurrency)
+    ])
+    return LoadResult(latencies, len(errors), time.perf_counter() - started, statuses)
+
+
+def wait_for_server(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def runserver_command(port='{port}'):
+    # Default server for the benchmarks: runserver from this interpreter, so
+    # it works on a stock install (gunicorn is not a requirement).
+    manage = shlex.quote(str(settings.BASE_DIR / 'manage.py'))
+    return f'{shlex.quote(sys.executable)} {manage} runserver --noreload --skip-checks 127.0.0.1:{port}'
+
+
+def start_server(command, env=None):
+    try:
+        return subprocess.Popen(shlex.split(command), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except FileNotFoundError as error:
+        raise CommandError(f'Cannot start the server, {error.filename} not found; pass --cmd')
@@ -0,0 +1,71 @@
+import asyncio
+import resource
+import shlex
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadgen import run_load, wait_for_server
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare WSGI worker and ASGI throughput on a read endpoint. '
+        'Starts both servers (gunicorn and uvicorn by default) unless --wsgi-url/--asgi-url '
+        'point at already running ones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/product/1/')
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--wsgi-url', help='Benchmark an already running WSGI server')
+        parser.add_argument('--asgi-url', help='Benchmark an already running ASGI server')
+        parser.add_argument(
+            '--wsgi-cmd',
+            default='gunicorn ananas.wsgi:application --workers {workers} --threads 8 --bind 127.0.0.1:{port}',
+        )
+        parser.add_argument(
+            '--asgi-cmd',
+            default='uvicorn ananas.asgi:application --workers {workers} --host 127.0.0.1 --port {port} --no-access-log',
+        )
+        parser.add_argument('--wsgi-port', type=int, default=8101)
+        parser.add_argument('--asgi-port', type=int, default=8102)
+
+    def raise_fd_limit(self, connections):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = min(hard, max(soft, connections * 2 + 256))
+        if wanted > soft:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    def bench(self, label, base_url, command, port, options):
+        process = None
+        if base_url is None:
+            command = command.format(workers=options['workers'], port=port)
+            base_url = f'http://127.0.0.1:{port}'
+            process = subprocess.Popen(shlex.split(command), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = base_url.rstrip('/') + options['path']
+        try:
+            if not wait_for_server(url):
+                raise CommandError(f'{label} server at {base_url} did not start')
+            asyncio.run(run_load(url, min(options['requests'], 1000), 50))
+            result = asyncio.run(run_load(url, options['requests'], options['connections']))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+        return result.summary()
+
+    def handle(self, *args, **options):
+        self.raise_fd_limit(options['connections'])
+        results = {
+            'wsgi': self.bench('WSGI', options['wsgi_url'], options['wsgi_cmd'], options['wsgi_port'], options),
+            'asgi': self.bench('ASGI', options['asgi_url'], options['asgi_cmd'], options['asgi_port'], options),
+        }
+        columns = ['requests', 'errors', 'seconds', 'rps', 'mean_ms', 'p50_ms', 'p99_ms']
+        self.stdout.write('server ' + ' '.join(f'{column:>9}' for column in columns))
+        for label, summary in results.items():
+            self.stdout.write(f'{label:<6} ' + ' '.join(f'{summary[column]:>9}' for column in columns))
+        speedup = results['asgi']['rps'] / results['wsgi']['rps'] if results['wsgi']['rps'] else 0
+        self.stdout.write(f'asgi/wsgi throughput: {speedup:.2f}x at {options["connections"]} connections')
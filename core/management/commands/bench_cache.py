@@ -0,0 +1,51 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_redis.cache import RedisCache
+
+from core.cache_backends import TwoTierRedisCache
+from core.loadgen import LoadResult
+from user.models import Vendor
+
+
+class Command(BaseCommand):
+    help = 'Compare get() latency of plain django_redis against the two-tier cache on a hot key set.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=100, help='Number of hot keys')
+        parser.add_argument('--reads', type=int, default=50000)
+        parser.add_argument('--skew', type=float, default=1.2, help='Zipf exponent of the key popularity')
+
+    def backends(self):
+        params = settings.CACHES['default']
+        options = {name: value for name, value in params.get('OPTIONS', {}).items() if not name.startswith('LOCAL_')}
+        one_tier = RedisCache(params['LOCATION'], {**params, 'OPTIONS': options, 'KEY_PREFIX': 'bench'})
+        two_tier = TwoTierRedisCache(params['LOCATION'], {
+            **params,
+            'KEY_PREFIX': 'bench',
+            'OPTIONS': {**options, 'LOCAL_KEY_PREFIXES': ['hot:'], 'LOCAL_TIMEOUT': 60, 'LOCAL_MAX_ENTRIES': 10000},
+        })
+        return [('1-tier', one_tier), ('2-tier', two_tier)]
+
+    def handle(self, *args, **options):
+        payload = Vendor(id=1, email='vendor@example.com', name='name', second_name='second', phone_number='1', description='d' * 200)
+        keys = [f'hot:{index}' for index in range(options['keys'])]
+        weights = [1 / (rank + 1) ** options['skew'] for rank in range(len(keys))]
+        reads = random.choices(keys, weights=weights, k=options['reads'])
+
+        for label, backend in self.backends():
+            backend.set_many({key: payload for key in keys}, timeout=300)
+            latencies = []
+            started = time.perf_counter()
+            for key in reads:
+                read_started = time.perf_counter()
+                backend.get(key)
+                latencies.append(time.perf_counter() - read_started)
+            summary = LoadResult(latencies, 0, time.perf_counter() - started).summary()
+            self.stdout.write(
+                f'{label}: {summary["rps"]} gets/s mean={summary["mean_ms"]}ms '
+                f'p50={summary["p50_ms"]}ms p99={summary["p99_ms"]}ms'
+            )
+            backend.delete_many(keys)
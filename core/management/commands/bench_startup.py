@@ -0,0 +1,48 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadgen import runserver_command, start_server, wait_for_server
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure cold start: the time from spawning a server process to its first response. '
+        'Fails when the median over --runs exceeds STARTUP_BUDGET (or --budget) seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/product/avp/')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--port', type=int, default=8103)
+        parser.add_argument('--budget', type=float, help='Seconds; defaults to settings.STARTUP_BUDGET')
+        parser.add_argument(
+            '--cmd', default=runserver_command(),
+            help='Server command, {port} is filled in, e.g. "gunicorn ananas.wsgi:application --bind 127.0.0.1:{port}"',
+        )
+
+    def run_once(self, command, url):
+        started = time.perf_counter()
+        process = start_server(command)
+        try:
+            if not wait_for_server(url):
+                raise CommandError(f'Server did not answer {url}')
+            return time.perf_counter() - started
+        finally:
+            process.terminate()
+            process.wait()
+
+    def handle(self, *args, **options):
+        budget = options['budget'] or settings.STARTUP_BUDGET
+        command = options['cmd'].format(port=options['port'])
+        url = f'http://127.0.0.1:{options["port"]}{options["path"]}'
+        timings = []
+        for run in range(options['runs']):
+            timings.append(self.run_once(command, url))
+            self.stdout.write(f'run {run + 1}: {timings[-1] * 1000:.0f}ms')
+        median = statistics.median(timings)
+        self.stdout.write(f'median {median * 1000:.0f}ms, max {max(timings) * 1000:.0f}ms, budget {budget * 1000:.0f}ms')
+        if median > budget:
+            raise CommandError(f'Startup took {median:.2f}s, over the {budget:.2f}s budget')
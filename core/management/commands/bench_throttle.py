@@ -0,0 +1,74 @@
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import ScopedRateThrottle
+
+from core.cache import _redis
+from core.loadgen import LoadResult
+from core.throttling import TokenBucketThrottle
+
+
+class BenchView:
+    throttle_scope = 'bench'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-request overhead of the Redis token bucket throttle with DRF ScopedRateThrottle '
+        '(cache-backed request history) under the same per-client budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--clients', type=int, default=100)
+        parser.add_argument('--per-minute', type=int, default=100, help='Budget per client and minute')
+
+    def requests(self, options):
+        factory = APIRequestFactory()
+        clients = [f'10.0.{index // 256}.{index % 256}' for index in range(options['clients'])]
+        return [
+            Request(factory.get('/', REMOTE_ADDR=random.choice(clients)))
+            for _ in range(options['requests'])
+        ]
+
+    def bench(self, label, make_throttle, requests):
+        view = BenchView()
+        latencies, denied = [], 0
+        started = time.perf_counter()
+        for request in requests:
+            throttle = make_throttle()
+            request_started = time.perf_counter()
+            if not throttle.allow_request(request, view):
+                denied += 1
+            latencies.append(time.perf_counter() - request_started)
+        summary = LoadResult(latencies, 0, time.perf_counter() - started).summary()
+        self.stdout.write(
+            f'{label:<16} {summary["rps"]:>10} checks/s mean={summary["mean_ms"]}ms '
+            f'p50={summary["p50_ms"]}ms p99={summary["p99_ms"]}ms denied={denied}'
+        )
+
+    def handle(self, *args, **options):
+        if _redis() is None:
+            raise CommandError('The default cache is not a Redis cache')
+        per_minute = options['per_minute']
+        requests = self.requests(options)
+
+        class BenchScopedThrottle(ScopedRateThrottle):
+            THROTTLE_RATES = {'bench': f'{per_minute}/m'}
+
+        buckets = {'bench': {
+            'anon': {'capacity': per_minute, 'refill_rate': per_minute / 60},
+            'user': {'capacity': per_minute, 'refill_rate': per_minute / 60},
+        }}
+        connection = _redis()
+        for key in connection.scan_iter('throttle:bench:*'):
+            connection.delete(key)
+        cache.delete_pattern('throttle_bench_*')
+        with override_settings(THROTTLE_BUCKETS=buckets):
+            self.bench('token bucket', TokenBucketThrottle, requests)
+        self.bench('scoped (cache)', BenchScopedThrottle, requests)
@@ -0,0 +1,13 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Print per-tier hit ratios of the two-tier cache, aggregated over all processes.'
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'tier_stats'):
+            raise CommandError('The default cache is not a two-tier cache')
+        self.stdout.write(json.dumps(cache.tier_stats(), indent=2, sort_keys=True))
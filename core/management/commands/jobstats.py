@@ -0,0 +1,15 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import queue
+
+
+class Command(BaseCommand):
+    help = 'Print queue depth and latency metrics for background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=300, help='Seconds of finished jobs to include')
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(queue.metrics(options['window']), indent=2, sort_keys=True))
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+BOOT = '''
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+'''
+
+VIEW_MODULES = '''
+import importlib, importlib.util
+from django.apps import apps
+for app in apps.get_app_configs():
+    for name in ('views', 'async_views'):
+        if importlib.util.find_spec(f'{app.name}.{name}'):
+            importlib.import_module(f'{app.name}.{name}')
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Boot Django in a fresh interpreter under `python -X importtime` and report the most '
+        'expensive imports of app loading and the URLconf (plus every view module with --views).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=30)
+        parser.add_argument('--sort', choices=['self', 'cumulative'], default='cumulative')
+        parser.add_argument('--views', action='store_true', help='Also import every view module')
+        parser.add_argument('--package', help='Only modules under this top-level package')
+
+    def measure(self, views):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT + (VIEW_MODULES if views else '')],
+            capture_output=True, text=True, env=os.environ.copy(),
+        )
+        if result.returncode:
+            raise CommandError(f'Boot failed:\n{result.stderr[-2000:]}')
+        modules = []
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and 'self [us]' not in line:
+                own, cumulative, name = line[len('import time:'):].split('|')
+                modules.append((name.strip(), int(own), int(cumulative)))
+        return modules
+
+    def handle(self, *args, **options):
+        modules = self.measure(options['views'])
+        total = sum(own for _, own, _ in modules)
+        if options['package']:
+            modules = [module for module in modules if module[0].split('.')[0] == options['package']]
+        column = 1 if options['sort'] == 'self' else 2
+        self.stdout.write(f'{len(modules)} modules, {total / 1000:.1f}ms importing in total')
+        self.stdout.write(f'{"self":>10} {"cumulative":>12}  module')
+        for name, own, cumulative in sorted(modules, key=lambda module: -module[column])[:options['top']]:
+            self.stdout.write(f'{own / 1000:>8.1f}ms {cumulative / 1000:>10.1f}ms  {name}')
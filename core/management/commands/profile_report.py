@@ -0,0 +1,68 @@
+import json
+import pstats
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from core.profiling import make_token, profile_dir
+
+
+class Command(BaseCommand):
+    help = 'Aggregate the per-request profiles in PROFILE_DIR into the hottest functions per view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--view', help='Only views whose name contains VIEW')
+        parser.add_argument('--sort', choices=['tottime', 'cumtime'], default='tottime')
+        parser.add_argument('--token', action='store_true', help='Print a value for the X-Profile header and exit')
+
+    def load(self, view_filter):
+        runs = defaultdict(list)
+        for path in sorted(profile_dir().glob('*.json')):
+            try:
+                with open(path) as meta_file:
+                    meta = json.load(meta_file)
+            except (OSError, ValueError):
+                continue
+            if path.with_suffix('.prof').exists() and (not view_filter or view_filter in meta['view']):
+                runs[meta['view']].append((meta, path.with_suffix('.prof')))
+        return runs
+
+    def report(self, view, runs, top, sort):
+        count = len(runs)
+        seconds = sum(meta['seconds'] for meta, _ in runs)
+        sql = sum(meta['sql']['seconds'] for meta, _ in runs)
+        queries = sum(meta['sql']['count'] for meta, _ in runs)
+        cache = sum(meta['cache']['seconds'] for meta, _ in runs)
+        cache_calls = sum(meta['cache']['count'] for meta, _ in runs)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{view}: {count} requests'))
+        self.stdout.write(
+            f'  mean {seconds / count * 1000:.1f}ms, sql {sql / count * 1000:.1f}ms ({queries / count:.1f} queries), '
+            f'cache {cache / count * 1000:.1f}ms ({cache_calls / count:.1f} calls) per request'
+        )
+
+        stats = pstats.Stats(str(runs[0][1]))
+        for _, path in runs[1:]:
+            stats.add(str(path))
+        column = 2 if sort == 'tottime' else 3
+        hottest = sorted(stats.stats.items(), key=lambda item: -item[1][column])[:top]
+        self.stdout.write(f'  {"tottime":>10} {"cumtime":>10} {"calls":>9}  function')
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in hottest:
+            self.stdout.write(
+                f'  {tottime / count * 1000:>8.2f}ms {cumtime / count * 1000:>8.2f}ms {calls / count:>9.1f}  '
+                f'{name} ({filename}:{line})'
+            )
+        slowest = max((query for meta, _ in runs for query in meta['sql']['slowest']), key=lambda query: query['seconds'], default=None)
+        if slowest:
+            self.stdout.write(f'  slowest query {slowest["seconds"] * 1000:.1f}ms: {slowest["sql"][:200]}')
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(make_token())
+            return
+        runs = self.load(options['view'])
+        if not runs:
+            self.stdout.write(f'No profiles in {profile_dir()}')
+            return
+        for view in sorted(runs, key=lambda view: -sum(meta['seconds'] for meta, _ in runs[view])):
+            self.report(view, runs[view], options['top'], options['sort'])
@@ -0,0 +1,77 @@
+import logging
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.utils.module_loading import autodiscover_modules
+
+from core import queue
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Process background jobs from the job table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queues', default='default', help='Comma separated queue names')
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'JOBS_CONCURRENCY', 4))
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--burst', action='store_true', help='Exit once the queues are empty')
+        parser.add_argument('--metrics-interval', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        autodiscover_modules('jobs')
+        queues = [name.strip() for name in options['queues'].split(',') if name.strip()]
+        self.stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: self.stopping.set())
+
+        queue.requeue_stale(getattr(settings, 'JOBS_STALE_TIMEOUT', 3600))
+        threads = [
+            threading.Thread(target=self.work, args=(queues, options), name=f'jobs-{index}', daemon=True)
+            for index in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f'Worker started: queues={",".join(queues)} concurrency={options["concurrency"]}')
+
+        last_report = time.monotonic()
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.2)
+            if time.monotonic() - last_report >= options['metrics_interval']:
+                self.report()
+                last_report = time.monotonic()
+        self.report()
+
+    def work(self, queues, options):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    job = queue.claim(queues)
+                except Exception:
+                    logger.exception('Could not claim a job')
+                    self.stopping.wait(options['poll_interval'])
+                    continue
+                if job is None:
+                    if options['burst']:
+                        break
+                    self.stopping.wait(options['poll_interval'])
+                    continue
+                queue.run(job)
+        finally:
+            connection.close()
+
+    def report(self):
+        queue.prune_finished(getattr(settings, 'JOBS_KEEP_FINISHED', 86400))
+        for name, stats in sorted(queue.metrics().items()):
+            self.stdout.write(
+                f'queue={name} depth={stats["depth"]} oldest_wait={stats["oldest_wait"]:.1f}s '
+                f'processed={stats["processed"]} failed={stats["failed"]} '
+                f'avg_wait={stats["avg_wait"]:.3f}s avg_duration={stats["avg_duration"]:.3f}s'
+            )
+        connection.close()
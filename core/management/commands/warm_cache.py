@@ -0,0 +1,71 @@
+import json
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.cache import hot_ids, store
+from product.cache import PRODUCT_DASHBOARD_KEY, build_product_dashboard, warm_product_detail
+from user.cache import USER_DASHBOARD_KEY, build_user_dashboard, warm_vendor_detail
+
+
+class Command(BaseCommand):
+    help = (
+        'Precompute dashboard, product detail and vendor payloads into the cache. '
+        'Hot ids come from recent access statistics unless --config names a JSON file '
+        'like {"products": [1, 2], "vendors": [3]}.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', help='JSON file with "products" and "vendors" id lists')
+        parser.add_argument('--top', type=int, default=200, help='Hot products/vendors to warm from access stats')
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def targets(self, options):
+        if options['config']:
+            try:
+                with open(options['config']) as config_file:
+                    config = json.load(config_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Could not read {options["config"]}: {exc}')
+            products, vendors = config.get('products', []), config.get('vendors', [])
+        else:
+            products, vendors = hot_ids('product', options['top']), hot_ids('vendor', options['top'])
+
+        yield 'product dashboard', lambda: self.store(PRODUCT_DASHBOARD_KEY, build_product_dashboard)
+        yield 'user dashboard', lambda: self.store(USER_DASHBOARD_KEY, build_user_dashboard)
+        for product_id in products:
+            yield f'product {product_id}', lambda product_id=product_id: warm_product_detail(product_id)
+        for vendor_id in vendors:
+            yield f'vendor {vendor_id}', lambda vendor_id=vendor_id: warm_vendor_detail(vendor_id)
+
+    def store(self, key, build):
+        started = time.perf_counter()
+        data = build()
+        store(key, data, settings.DASHBOARD_CACHE_TIMEOUT, delta=time.perf_counter() - started)
+        return data
+
+    def warm(self, builder):
+        try:
+            data = builder()
+            return len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL)) if data is not None else 0
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stored, failed, size = 0, 0, 0
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            futures = {executor.submit(self.warm, builder): label for label, builder in self.targets(options)}
+            for future in as_completed(futures):
+                try:
+                    size += future.result()
+                    stored += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{futures[future]}: {exc}')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Warmed {stored} keys ({failed} failed), {size} bytes in {elapsed:.2f}s')
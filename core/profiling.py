@@ -0,0 +1,186 @@
+import cProfile
+import json
+import logging
+import random
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_X_PROFILE'
+SALT = 'core.profiling'
+CACHE_METHODS = [
+    'get', 'set', 'add', 'delete', 'get_many', 'set_many', 'delete_many', 'get_or_set', 'incr', 'decr', 'touch',
+]
+
+
+def make_token():
+    # Value for the X-Profile request header; valid for PROFILE_TOKEN_MAX_AGE.
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None)
+    if view_class is not None:
+        return f'{view_class.__module__}.{view_class.__name__}'
+    return match.view_name or f'{match.func.__module__}.{match.func.__name__}'
+
+
+class QueryTimer:
+    # connection.execute_wrapper() hook collecting (sql, seconds) per query.
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((context['connection'].alias, sql, time.perf_counter() - started))
+
+
+class CacheTimer:
+    # Times the cache calls of this request by wrapping the methods of the
+    # (per-thread) cache instances and restoring them afterwards.
+
+    def __init__(self):
+        self.calls = {}
+        self._patched = []
+
+    def _wrap(self, alias, name, method):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                count, seconds = self.calls.get(f'{alias}.{name}', (0, 0.0))
+                self.calls[f'{alias}.{name}'] = (count + 1, seconds + time.perf_counter() - started)
+        return timed
+
+    def __enter__(self):
+        for alias in settings.CACHES:
+            cache = caches[alias]
+            for name in CACHE_METHODS:
+                if hasattr(cache, name):
+                    setattr(cache, name, self._wrap(alias, name, getattr(cache, name)))
+                    self._patched.append((cache, name))
+        return self
+
+    def __exit__(self, *exc_info):
+        for cache, name in self._patched:
+            cache.__dict__.pop(name, None)
+
+
+class ProfilingMiddleware:
+    # Runs a request under cProfile when it carries a valid signed X-Profile
+    # header (see make_token()) or is picked by PROFILE_SAMPLE_RATE, and
+    # writes <id>.prof (pstats) and <id>.json (view, timings, SQL, cache
+    # calls) to PROFILE_DIR, keeping the newest PROFILE_MAX_ARTIFACTS.
+    #
+    # Under ASGI the middleware is async and passes every request through
+    # unprofiled: cProfile and the SQL/cache timers only see their own
+    # thread, while async views run on the event loop (interleaved with other
+    # requests) and their queries in sync_to_async threads. Profile those
+    # views with the sync stack (ANANAS_ASYNC_VIEWS=0) instead.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def wanted(self, request):
+        token = request.META.get(HEADER)
+        if token:
+            try:
+                signing.TimestampSigner(salt=SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+                return True
+            except signing.BadSignature:
+                logger.warning('Ignoring invalid X-Profile header')
+        rate = settings.PROFILE_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.wanted(request):
+            return self.get_response(request)
+
+        queries = QueryTimer()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            cache_calls = stack.enter_context(CacheTimer())
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - started
+
+        try:
+            artifact = self.write(request, response, profiler, queries, cache_calls, elapsed)
+        except OSError:
+            logger.warning('Could not write profile artifact', exc_info=True)
+        else:
+            response['X-Profile-Id'] = artifact
+        return response
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def write(self, request, response, profiler, queries, cache_calls, elapsed):
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        artifact = f'{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}'
+        profiler.dump_stats(directory / f'{artifact}.prof')
+        slowest = sorted(queries.queries, key=lambda query: -query[2])[:settings.PROFILE_MAX_QUERIES]
+        meta = {
+            'id': artifact,
+            'view': view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'seconds': elapsed,
+            'sql': {
+                'count': len(queries.queries),
+                'seconds': sum(query[2] for query in queries.queries),
+                'slowest': [{'alias': alias, 'sql': sql, 'seconds': seconds} for alias, sql, seconds in slowest],
+            },
+            'cache': {
+                'count': sum(count for count, _ in cache_calls.calls.values()),
+                'seconds': sum(seconds for _, seconds in cache_calls.calls.values()),
+                'calls': {name: {'count': count, 'seconds': seconds} for name, (count, seconds) in cache_calls.calls.items()},
+            },
+        }
+        with open(directory / f'{artifact}.json', 'w') as output:
+            json.dump(meta, output, indent=2)
+        self.prune(directory)
+        return artifact
+
+    def prune(self, directory):
+        artifacts = sorted(directory.glob('*.json'))
+        for stale in artifacts[:max(0, len(artifacts) - settings.PROFILE_MAX_ARTIFACTS)]:
+            stale.with_suffix('.prof').unlink(missing_ok=True)
+            stale.unlink(missing_ok=True)
@@ -0,0 +1,141 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def job(func=None, *, queue='default', max_attempts=None):
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        registry[name] = func
+
+        def delay(*args, **kwargs):
+            return enqueue(name, args, kwargs, queue=queue, max_attempts=max_attempts)
+
+        def schedule(run_at, *args, **kwargs):
+            return enqueue(name, args, kwargs, queue=queue, max_attempts=max_attempts, run_at=run_at)
+
+        func.delay = delay
+        func.schedule = schedule
+        func.job_name = name
+        return func
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, queue='default', max_attempts=None, run_at=None):
+    if _setting('JOBS_ALWAYS_EAGER', False):
+        return registry[name](*args, **(kwargs or {}))
+    return Job.objects.create(
+        name=name,
+        queue=queue,
+        args=list(args),
+        kwargs=kwargs or {},
+        max_attempts=max_attempts or _setting('JOBS_MAX_ATTEMPTS', 5),
+        run_at=run_at or timezone.now(),
+    )
+
+
+def backoff(attempts):
+    base = _setting('JOBS_RETRY_BACKOFF', 2.0)
+    delay = min(base * 2 ** (attempts - 1), _setting('JOBS_RETRY_BACKOFF_MAX', 600.0))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim(queues):
+    # SKIP LOCKED lets any number of workers poll the same table without
+    # blocking on (or double-claiming) each other's rows.
+    now = timezone.now()
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            queue__in=queues, status=Job.QUEUED, run_at__lte=now,
+        ).order_by('run_at', 'id').first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.started_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+    return job
+
+
+def run(job):
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown job {job.name}')
+        func(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts and func is not None:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + backoff(job.attempts)
+            logger.warning('Job %s #%s failed, retrying at %s', job.name, job.id, job.run_at)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+            logger.error('Job %s #%s failed permanently', job.name, job.id)
+    else:
+        job.status = Job.DONE
+        job.finished_at = timezone.now()
+        job.last_error = ''
+    job.save(update_fields=['status', 'run_at', 'finished_at', 'last_error'])
+    return job
+
+
+def requeue_stale(timeout):
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff).update(status=Job.QUEUED, run_at=timezone.now())
+
+
+def prune_finished(keep):
+    cutoff = timezone.now() - timedelta(seconds=keep)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def metrics(window=300):
+    now = timezone.now()
+    since = now - timedelta(seconds=window)
+    queues = {}
+    pending = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).values('queue').annotate(
+        depth=Count('id'), oldest=Min('run_at'),
+    )
+    for row in pending:
+        queues.setdefault(row['queue'], {})
+        queues[row['queue']]['depth'] = row['depth']
+        queues[row['queue']]['oldest_wait'] = (now - row['oldest']).total_seconds()
+    recent = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__gte=since).values('queue').annotate(
+        processed=Count('id'),
+        failed=Count('id', filter=Q(status=Job.FAILED)),
+        avg_wait=Avg(F('started_at') - F('run_at')),
+        avg_duration=Avg(F('finished_at') - F('started_at')),
+    )
+    for row in recent:
+        stats = queues.setdefault(row['queue'], {})
+        stats['processed'] = row['processed']
+        stats['failed'] = row['failed']
+        stats['avg_wait'] = row['avg_wait'].total_seconds() if row['avg_wait'] else 0.0
+        stats['avg_duration'] = row['avg_duration'].total_seconds() if row['avg_duration'] else 0.0
+        stats['throughput'] = row['processed'] / window
+    for stats in queues.values():
+        for key in ('depth', 'oldest_wait', 'processed', 'failed', 'avg_wait', 'avg_duration', 'throughput'):
+            stats.setdefault(key, 0)
+    return queues
@@ -0,0 +1,90 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+from .cache import _redis
+
+logger = logging.getLogger(__name__)
+
+# Refills the bucket for the time elapsed since the last call (using the
+# Redis clock, so app servers need not agree on the time), then tries to take
+# `cost` tokens. Returns {allowed, seconds until enough tokens}.
+TOKEN_BUCKET_SCRIPT = '''
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(wait)}
+'''
+
+_scripts = {}
+
+
+def _script(connection):
+    # register_script() sends EVALSHA and only falls back to EVAL (and caches
+    # the script server side) when Redis does not know the hash yet.
+    script = _scripts.get(id(connection))
+    if script is None:
+        script = _scripts[id(connection)] = connection.register_script(TOKEN_BUCKET_SCRIPT)
+    return script
+
+
+class TokenBucketThrottle(BaseThrottle):
+    # Budgets come from settings.THROTTLE_BUCKETS[view.throttle_scope], with
+    # separate 'user' (per authenticated user) and 'anon' (per client address)
+    # buckets: {'capacity': burst size, 'refill_rate': tokens per second}.
+    # Views may set throttle_cost to charge more than one token per request.
+    scope_attr = 'throttle_scope'
+
+    def get_bucket(self, request, view):
+        scope = getattr(view, self.scope_attr, None)
+        if scope is None:
+            return None, None
+        try:
+            budgets = settings.THROTTLE_BUCKETS[scope]
+        except KeyError:
+            raise ImproperlyConfigured(f'No THROTTLE_BUCKETS entry for scope "{scope}"')
+        if request.user and request.user.is_authenticated:
+            return f'throttle:{scope}:user:{request.user.pk}', budgets['user']
+        return f'throttle:{scope}:anon:{self.get_ident(request)}', budgets['anon']
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        key, budget = self.get_bucket(request, view)
+        if key is None:
+            return True
+        connection = _redis()
+        if connection is None:
+            return True
+        try:
+            allowed, wait = _script(connection)(
+                keys=[key], args=[budget['capacity'], budget['refill_rate'], getattr(view, 'throttle_cost', 1)],
+            )
+        except Exception:
+            # Fail open: losing Redis must not take the endpoints down with it.
+            logger.warning('Token bucket throttle unavailable', exc_info=True)
+            return True
+        if allowed:
+            return True
+        self.wait_seconds = float(wait)
+        return False
+
+    def wait(self):
+        return self.wait_seconds
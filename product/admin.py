@@ -1,7 +1,17 @@
 from django.contrib import admin
-from .models import Product, Category, Cart, Comment
+from .models import Product, Category, Cart, CartItem, Comment
+
+
+class CartItemInline(admin.TabularInline):
+    model = CartItem
+    extra = 0
+
+
+class CartAdmin(admin.ModelAdmin):
+    inlines = [CartItemInline]
+
 
 admin.site.register(Category)
 admin.site.register(Product)
-admin.site.register(Cart)
+admin.site.register(Cart, CartAdmin)
 admin.site.register(Comment)
@@ -0,0 +1,133 @@
+import operator
+from functools import reduce
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404
+from rest_framework import permissions
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.async_views import AsyncAPIView
+from core.cache import arecord_access, aget_or_compute
+from user.serializers import CustomerRegisterSerializer
+from .cache import aget_categories, get_cart_summary, product_detail_key
+from .facets import get_product_facets
+from .filters import ProductFilter
+from .models import Product, Cart, CartItem
+from .partitions import product_comments, recent_since
+from .serializers import ProductSerializer, CartItemSerializer, CommentSerializer
+
+
+def _positive_int(value, default):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+class ProductList(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    search_fields = ['name', 'category__id']
+    ordering_fields = {field.name for field in Product._meta.concrete_fields}
+
+    def filter_queryset(self, request):
+        filterset = ProductFilter(request.GET, queryset=Product.objects.all())
+        if not filterset.is_valid():
+            return None, filterset.errors
+        queryset = filterset.qs
+
+        terms = request.GET.get('search', '').replace(',', ' ').split()
+        for term in terms:
+            queryset = queryset.filter(reduce(operator.or_, [
+                Q(**{f'{field}__icontains': term}) for field in self.search_fields
+            ]))
+        if terms:
+            queryset = queryset.distinct()
+
+        ordering = [
+            field for field in request.GET.get('ordering', '').split(',')
+            if field.strip().lstrip('-') in self.ordering_fields
+        ]
+        if ordering:
+            queryset = queryset.order_by(*[field.strip() for field in ordering])
+        return queryset, None
+
+    def page_links(self, request, count, limit, offset):
+        url = request.build_absolute_uri()
+        next_url = previous_url = None
+        if offset + limit < count:
+            next_url = replace_query_param(replace_query_param(url, 'limit', limit), 'offset', offset + limit)
+        if offset > 0:
+            url = replace_query_param(url, 'limit', limit)
+            if offset - limit <= 0:
+                previous_url = remove_query_param(url, 'offset')
+            else:
+                previous_url = replace_query_param(url, 'offset', offset - limit)
+        return next_url, previous_url
+
+    async def get(self, request):
+        queryset, errors = await sync_to_async(self.filter_queryset)(request)
+        if errors is not None:
+            return self.response(errors, status=400)
+
+        limit = _positive_int(request.GET.get('limit'), settings.REST_FRAMEWORK['PAGE_SIZE']) or settings.REST_FRAMEWORK['PAGE_SIZE']
+        offset = _positive_int(request.GET.get('offset'), 0)
+        count = await queryset.acount()
+        products = [product async for product in queryset[offset:offset + limit]]
+        serializer = ProductSerializer(products, many=True, context={'categories': await aget_categories()})
+
+        next_url, previous_url = self.page_links(request, count, limit, offset)
+        data = {
+            'count': count,
+            'next': next_url,
+            'previous': previous_url,
+            'results': serializer.data,
+        }
+        if request.GET.get('facets') == '1':
+            data['facets'] = await sync_to_async(get_product_facets)(queryset, request.GET)
+        return self.response(data)
+
+
+class ProductDetailAPIView(AsyncAPIView):
+
+    async def get(self, request, id):
+        await arecord_access('product', id)
+        history = request.GET.get('history') == '1'
+        data = await aget_or_compute(
+            product_detail_key(id, history), lambda: self.build(id, history), settings.PRODUCT_DETAIL_CACHE_TIMEOUT,
+        )
+        return self.response(data)
+
+    async def build(self, id, history):
+        try:
+            product = await Product.objects.aget(id=id)
+        except Product.DoesNotExist:
+            raise Http404
+        comments = [comment async for comment in product_comments(product, history)]
+        serializer = ProductSerializer(product, context={'categories': await aget_categories()})
+        data = dict(serializer.data)
+        data['comments'] = list(CommentSerializer(comments, many=True).data)
+        data['comments_since'] = None if history else recent_since()
+        return data
+
+
+class CartDetailAPIView(AsyncAPIView):
+
+    async def get(self, request, user_id):
+        try:
+            cart = await Cart.objects.select_related('customer').aget(customer_id=user_id)
+        except Cart.DoesNotExist:
+            raise Http404
+        items = [item async for item in CartItem.objects.filter(cart=cart, product__deleted_at__isnull=True).select_related('product')]
+        products = [item.product for item in items]
+        categories = await aget_categories()
+        data = {
+            'id': cart.id,
+            'product': ProductSerializer(products, many=True, context={'categories': categories}).data,
+            'customer': CustomerRegisterSerializer(cart.customer).data,
+            'items': CartItemSerializer(items, many=True).data,
+            'summary': await sync_to_async(get_cart_summary)(cart.id),
+        }
+        return self.response(data)
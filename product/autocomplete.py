@@ -0,0 +1,218 @@
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db.models import Count
+
+from core.cache import _redis
+from .models import CartItem, Product
+
+_separators = re.compile(r'[^\w]+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_separators.sub(' ', text.casefold()).split())
+
+
+def prefix_key(prefix, namespace=None):
+    return f'{namespace or settings.AUTOCOMPLETE_KEY_PREFIX}:{prefix}'
+
+
+def build_namespace():
+    # rebuild() fills this namespace and renames its keys over the live ones.
+    return f'{settings.AUTOCOMPLETE_KEY_PREFIX}~build'
+
+
+def building_key():
+    return f'{build_namespace()}~active'
+
+
+def word_tails(name):
+    words = normalize(name).split(' ')
+    return [' '.join(words[index:]) for index in range(len(words))]
+
+
+def prefixes(name):
+    # Every prefix of the name starting at each of its words, so "iph" and
+    # "iphone c" both find "Red iPhone case". Longer queries are cut to
+    # AUTOCOMPLETE_MAX_PREFIX and narrowed after the lookup.
+    longest = settings.AUTOCOMPLETE_MAX_PREFIX
+    result = set()
+    for tail in word_tails(name):
+        tail = tail[:longest]
+        result.update(tail[:length].rstrip() for length in range(1, len(tail) + 1))
+    result.discard('')
+    return result
+
+
+def member(product_id, name):
+    return f'{product_id}:{name}'
+
+
+def _add(pipeline, product_id, name, score, namespace=None):
+    value = member(product_id, name)
+    limit = settings.AUTOCOMPLETE_PREFIX_LIMIT
+    for prefix in prefixes(name):
+        key = prefix_key(prefix, namespace)
+        pipeline.zadd(key, {value: score})
+        # Only the most popular names of a prefix are kept, so short prefixes
+        # stay small no matter how large the catalog gets.
+        pipeline.zremrangebyrank(key, 0, -limit - 1)
+
+
+def _remove(pipeline, product_id, name, namespace=None):
+    value = member(product_id, name)
+    for prefix in prefixes(name):
+        pipeline.zrem(prefix_key(prefix, namespace), value)
+
+
+def _namespaces(connection):
+    # Writes during a rebuild go to the index being built as well, so the
+    # swap does not bring back what they changed.
+    if connection.exists(building_key()):
+        return [None, build_namespace()]
+    return [None]
+
+
+def popularity(product_id):
+    # The number of carts holding the product; quantities do not count.
+    return CartItem.objects.filter(product_id=product_id).count()
+
+
+def index_product(product_id, name, previous_name=None):
+    connection = _redis()
+    if connection is None:
+        return
+    score = popularity(product_id)
+    pipeline = connection.pipeline(transaction=False)
+    for namespace in _namespaces(connection):
+        if previous_name is not None and previous_name != name:
+            _remove(pipeline, product_id, previous_name, namespace)
+        _add(pipeline, product_id, name, score, namespace)
+    pipeline.execute()
+
+
+def unindex_product(product_id, name):
+    unindex_products({product_id: name})
+
+
+def unindex_products(names):
+    connection = _redis()
+    if connection is None or not names:
+        return
+    pipeline = connection.pipeline(transaction=False)
+    for namespace in _namespaces(connection):
+        for product_id, name in names.items():
+            _remove(pipeline, product_id, name, namespace)
+    pipeline.execute()
+
+
+def refresh_popularity(product_id):
+    name = Product.objects.filter(pk=product_id).values_list('name', flat=True).first()
+    if name is not None:
+        index_product(product_id, name)
+
+
+def clear(namespace=None):
+    connection = _redis()
+    if connection is None:
+        return 0
+    removed = 0
+    keys = []
+    for key in connection.scan_iter(prefix_key('*', namespace), count=1000):
+        keys.append(key)
+        if len(keys) >= 1000:
+            removed += connection.unlink(*keys)
+            keys = []
+    if keys:
+        removed += connection.unlink(*keys)
+    return removed
+
+
+def _swap(connection, batch_size):
+    # Live prefixes the new index does not have are dropped first, then every
+    # built key is renamed over its live key. RENAME replaces a key in one
+    # step, so each prefix always answers from a complete set.
+    live = f'{settings.AUTOCOMPLETE_KEY_PREFIX}:'
+    built = f'{build_namespace()}:'
+    keys = []
+    for key in connection.scan_iter(prefix_key('*'), count=batch_size):
+        keys.append(key)
+        if len(keys) >= batch_size:
+            _drop_missing(connection, keys, live, built)
+            keys = []
+    _drop_missing(connection, keys, live, built)
+    pipeline = connection.pipeline(transaction=False)
+    for index, key in enumerate(connection.scan_iter(prefix_key('*', build_namespace()), count=batch_size), 1):
+        pipeline.rename(key, live + key.decode()[len(built):])
+        if index % batch_size == 0:
+            pipeline.execute()
+    pipeline.execute()
+
+
+def _drop_missing(connection, keys, live, built):
+    if not keys:
+        return
+    pipeline = connection.pipeline(transaction=False)
+    for key in keys:
+        pipeline.exists(built + key.decode()[len(live):])
+    missing = [key for key, exists in zip(keys, pipeline.execute()) if not exists]
+    if missing:
+        connection.unlink(*missing)
+
+
+def rebuild(batch_size=1000, rows=None):
+    # Fills a separate namespace from `rows` ((id, name, score) tuples), or
+    # from the live products scored by how many carts hold them, and swaps it
+    # in at the end; the old index keeps answering until then.
+    connection = _redis()
+    if connection is None:
+        return 0
+    clear(build_namespace())
+    connection.set(building_key(), 1, ex=24 * 60 * 60)
+    try:
+        if rows is None:
+            rows = Product.objects.annotate(score=Count('cartitem')).values_list('id', 'name', 'score').iterator(
+                chunk_size=batch_size,
+            )
+        count = 0
+        pipeline = connection.pipeline(transaction=False)
+        for product_id, name, score in rows:
+            _add(pipeline, product_id, name, score, build_namespace())
+            count += 1
+            if count % batch_size == 0:
+                pipeline.execute()
+        pipeline.execute()
+        _swap(connection, batch_size)
+    finally:
+        connection.delete(building_key())
+        clear(build_namespace())
+    return count
+
+
+def suggest(query, limit=None):
+    # One ZREVRANGE on the prefix set; None when there is no Redis index.
+    limit = min(limit or settings.AUTOCOMPLETE_LIMIT, settings.AUTOCOMPLETE_PREFIX_LIMIT)
+    query = normalize(query)
+    if not query:
+        return []
+    connection = _redis()
+    if connection is None:
+        return None
+    longest = settings.AUTOCOMPLETE_MAX_PREFIX
+    narrow = len(query) > longest
+    members = connection.zrevrange(
+        prefix_key(query[:longest].rstrip()), 0, (settings.AUTOCOMPLETE_PREFIX_LIMIT if narrow else limit) - 1,
+    )
+    results = []
+    for value in members:
+        product_id, name = value.decode().split(':', 1)
+        if narrow and not any(tail.startswith(query) for tail in word_tails(name)):
+            continue
+        results.append({'id': int(product_id), 'name': name})
+        if len(results) >= limit:
+            break
+    return results
+
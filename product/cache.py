@@ -0,0 +1,218 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Sum, Window
+
+from core.cache import store
+
+CATEGORY_VERSION_KEY = 'product:categories:version'
+
+_category_lock = threading.Lock()
+_categories = None
+_categories_version = None
+_categories_checked_at = 0.0
+
+
+def _category_poll_interval():
+    return getattr(settings, 'CATEGORY_CACHE_POLL_INTERVAL', 1.0)
+
+
+def _category_version():
+    version = cache.get(CATEGORY_VERSION_KEY)
+    if version is None:
+        cache.add(CATEGORY_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CATEGORY_VERSION_KEY)
+    return version
+
+
+def get_categories():
+    # Per-process {id: name} map. The shared version key is polled at most
+    # once per interval, so a write in any worker is picked up everywhere.
+    global _categories, _categories_version, _categories_checked_at
+    now = time.monotonic()
+    if _categories is not None and now - _categories_checked_at < _category_poll_interval():
+        return _categories
+    with _category_lock:
+        version = _category_version()
+        if _categories is None or version != _categories_version:
+            from .models import Category
+            _categories = dict(Category.objects.values_list('id', 'name'))
+            _categories_version = version
+        _categories_checked_at = now
+    return _categories
+
+
+def get_category_name(category_id):
+    return get_categories().get(category_id)
+
+
+def invalidate_categories():
+    global _categories
+    cache.set(CATEGORY_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    with _category_lock:
+        _categories = None
+
+
+async def aget_categories():
+    global _categories, _categories_version, _categories_checked_at
+    now = time.monotonic()
+    if _categories is not None and now - _categories_checked_at < _category_poll_interval():
+        return _categories
+    version = await cache.aget(CATEGORY_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATEGORY_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = await cache.aget(CATEGORY_VERSION_KEY)
+    if _categories is None or version != _categories_version:
+        from .models import Category
+        categories = {category_id: name async for category_id, name in Category.objects.values_list('id', 'name')}
+        with _category_lock:
+            _categories, _categories_version = categories, version
+    _categories_checked_at = now
+    return _categories
+
+
+PRODUCT_DASHBOARD_KEY = 'product:dashboard'
+
+
+def build_product_dashboard():
+    from .models import Product
+
+    category_names = get_categories()
+    totals = Product.objects.aggregate(product_count=Count('id'), avg_price=Avg('price'), sum_price=Sum('price'))
+    category_price = {
+        row['category_id']: row
+        for row in Product.objects.values('category_id').annotate(product_count=Count('id'), avg_price=Avg('price'))
+    }
+    categories = [{
+        'id': category_id,
+        'name': name,
+        'product_count': category_price.get(category_id, {}).get('product_count', 0),
+        'сategory_price': category_price.get(category_id, {}).get('avg_price'),
+    } for category_id, name in category_names.items()]
+    return {
+        'average_price': totals['avg_price'],
+        'product_count': totals['product_count'],
+        'category_count': len(category_names),
+        'total_price': totals['sum_price'],
+        'categories': categories,
+    }
+
+
+def product_detail_key(product_id, history=False):
+    return f'product:{product_id}:detail:history' if history else f'product:{product_id}:detail'
+
+
+def build_product_detail(product, history=False):
+    from .partitions import product_comments, recent_since
+    from .serializers import ProductSerializer, CommentSerializer
+
+    data = dict(ProductSerializer(product).data)
+    data['comments'] = list(CommentSerializer(product_comments(product, history), many=True).data)
+    data['comments_since'] = None if history else recent_since()
+    return data
+
+
+def warm_product_detail(product_id):
+    from .models import Product
+
+    product = Product.objects.filter(id=product_id).first()
+    if product is None:
+        return None
+    data = build_product_detail(product)
+    store(product_detail_key(product_id), data, settings.PRODUCT_DETAIL_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_product_detail(product_id):
+    cache.delete_many([product_detail_key(product_id), product_detail_key(product_id, history=True)])
+
+
+def invalidate_product_details(product_ids):
+    cache.delete_many([
+        product_detail_key(product_id, history) for product_id in product_ids for history in (False, True)
+    ])
+
+
+def cart_generation_key(cart_id):
+    return f'cart:{cart_id}:generation'
+
+
+def cart_summary_key(cart_id, generation):
+    return f'cart:{cart_id}:summary:{generation}'
+
+
+def _cart_generation(cart_id):
+    generation = cache.get(cart_generation_key(cart_id))
+    if generation is None:
+        cache.add(cart_generation_key(cart_id), uuid.uuid4().hex, settings.CART_SUMMARY_CACHE_TIMEOUT)
+        generation = cache.get(cart_generation_key(cart_id))
+    return generation
+
+
+def build_cart_summary(cart_id):
+    # One query: the cart lines with their per-vendor subtotals computed by
+    # window aggregates, so totals never need a second pass over the products.
+    from .models import CartItem
+
+    line_total = F('quantity') * F('product__price')
+    by_vendor = {'partition_by': [F('product__vendor_id')]}
+    lines = CartItem.objects.filter(cart_id=cart_id, product__deleted_at__isnull=True).annotate(
+        line_total=line_total,
+        vendor_items=Window(Sum('quantity'), **by_vendor),
+        vendor_subtotal=Window(Sum(line_total), **by_vendor),
+    ).order_by('product__vendor_id', 'product_id').values(
+        'product_id', 'product__name', 'product__price', 'product__vendor_id', 'quantity',
+        'line_total', 'vendor_items', 'vendor_subtotal',
+    )
+
+    summary = {'cart': cart_id, 'item_count': 0, 'total_price': 0, 'vendors': [], 'lines': []}
+    for line in lines:
+        if not summary['vendors'] or summary['vendors'][-1]['vendor'] != line['product__vendor_id']:
+            summary['vendors'].append({
+                'vendor': line['product__vendor_id'],
+                'item_count': line['vendor_items'],
+                'subtotal': line['vendor_subtotal'],
+            })
+            summary['item_count'] += line['vendor_items']
+            summary['total_price'] += line['vendor_subtotal']
+        summary['lines'].append({
+            'product': line['product_id'],
+            'name': line['product__name'],
+            'unit_price': line['product__price'],
+            'quantity': line['quantity'],
+            'line_total': line['line_total'],
+            'vendor': line['product__vendor_id'],
+        })
+    return summary
+
+
+def get_cart_summary(cart_id):
+    # Summaries are stored under the cart's generation as read before the
+    # build. Invalidation replaces the generation, so a build that raced a
+    # cart or price write lands under a key nobody reads any more.
+    generation = _cart_generation(cart_id)
+    summary = cache.get(cart_summary_key(cart_id, generation))
+    if summary is None:
+        summary = build_cart_summary(cart_id)
+        cache.set(cart_summary_key(cart_id, generation), summary, settings.CART_SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_cart_summary(cart_id):
+    invalidate_cart_summaries_of([cart_id])
+
+
+def invalidate_cart_summaries_of(cart_ids):
+    cache.set_many(
+        {cart_generation_key(cart_id): uuid.uuid4().hex for cart_id in cart_ids}, settings.CART_SUMMARY_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_cart_summaries(product_ids):
+    from .models import CartItem
+
+    cart_ids = CartItem.objects.filter(product_id__in=product_ids).values_list('cart_id', flat=True).distinct()
+    invalidate_cart_summaries_of(cart_ids)
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import ProductChange, ProductChangeHorizon
+from .serializers import ProductSerializer
+
+# Log rows are read in (txid, id) order, and only from transactions older
+# than the reader's snapshot xmin. Ids are taken at insert time, so a
+# transaction holding a lower id can commit after a higher one; no
+# transaction below xmin can still commit, so a cursor never passes a row
+# that shows up later.
+START = (0, 0)
+
+
+def _txid():
+    return RawSQL('txid_current()', [])
+
+
+def _xmin():
+    return RawSQL('txid_snapshot_xmin(txid_current_snapshot())', [])
+
+
+def parse_cursor(value):
+    # '<txid>.<id>' as returned by changes_since; '0' (or nothing) is a full
+    # sync. A plain id is a cursor from before txids were recorded, when
+    # every row had txid 0. Raises ValueError on anything else.
+    if not value:
+        return START
+    txid, _, change_id = value.rpartition('.')
+    return int(txid or 0), int(change_id)
+
+
+def format_cursor(cursor):
+    return '0' if cursor == START else f'{cursor[0]}.{cursor[1]}'
+
+
+def _after(cursor):
+    return Q(txid__gt=cursor[0]) | Q(txid=cursor[0], id__gt=cursor[1])
+
+
+def record_change(product, action):
+    data = None if action == ProductChange.DELETE else ProductSerializer(product).data
+    return ProductChange.objects.create(product_id=product.id, action=action, data=data, txid=_txid())
+
+
+def record_deletes(product_ids):
+    ProductChange.objects.bulk_create(
+        [ProductChange(product_id=product_id, action=ProductChange.DELETE, txid=_txid()) for product_id in product_ids],
+        batch_size=1000,
+    )
+
+
+def horizon():
+    # Tombstones up to this cursor have been pruned; cursors before it may
+    # have missed deletes and must resync from scratch.
+    row = ProductChangeHorizon.objects.filter(pk=1).values_list('txid', 'change_id').first()
+    return row or START
+
+
+def advance_horizon(cursor):
+    # Stored in the database rather than the cache so that an eviction can
+    # never let a stale cursor through.
+    ProductChangeHorizon.objects.get_or_create(pk=1)
+    current = ProductChangeHorizon.objects.select_for_update().get(pk=1)
+    if (current.txid, current.change_id) < tuple(cursor):
+        current.txid, current.change_id = cursor
+        current.save(update_fields=['txid', 'change_id'])
+
+
+def changes_since(since, limit):
+    # One entry per product (its latest change) among the next `limit` log rows.
+    rows = list(
+        ProductChange.objects.filter(_after(since), txid__lt=_xmin()).order_by('txid', 'id')[:limit]
+    )
+    latest = {}
+    for row in rows:
+        latest.pop(row.product_id, None)
+        latest[row.product_id] = row
+    return {
+        'cursor': format_cursor((rows[-1].txid, rows[-1].id) if rows else since),
+        'has_more': len(rows) == limit,
+        'changes': [
+            {'product': row.product_id, 'action': row.action, 'data': row.data}
+            for row in latest.values()
+        ],
+    }
+
+
+def compact(batch_size=None, retention=None):
+    # Drops log rows superseded by a later change of the same product, then
+    # tombstones older than the retention period. Every batch commits on its own.
+    batch_size = batch_size or settings.PRODUCT_CHANGES_COMPACT_BATCH
+    retention = settings.PRODUCT_CHANGES_RETENTION if retention is None else retention
+    superseded = ProductChange.objects.filter(Exists(
+        ProductChange.objects.filter(
+            Q(txid__gt=OuterRef('txid')) | Q(txid=OuterRef('txid'), id__gt=OuterRef('id')),
+            product_id=OuterRef('product_id'),
+        )
+    ))
+    expired = ProductChange.objects.filter(
+        action=ProductChange.DELETE, created_at__lt=timezone.now() - timedelta(seconds=retention),
+    )
+    removed = {'superseded': 0, 'expired': 0}
+    for label, queryset in (('superseded', superseded), ('expired', expired)):
+        while True:
+            with transaction.atomic():
+                rows = list(queryset.order_by('txid', 'id').values_list('txid', 'id')[:batch_size])
+                if not rows:
+                    break
+                ids = [change_id for txid, change_id in rows]
+                if label == 'expired':
+                    advance_horizon(rows[-1])
+                ProductChange.objects.filter(id__in=ids).delete()
+            removed[label] += len(ids)
+    return removed
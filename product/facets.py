@@ -0,0 +1,85 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, When, Value, IntegerField, Count
+from django.utils.http import urlencode
+
+from .cache import get_categories
+from .filters import ProductFilter
+
+FACETS_VERSION_KEY = 'product:facets:version'
+
+
+def get_price_buckets(params):
+    raw = params.get('price_buckets')
+    if raw:
+        try:
+            edges = sorted({int(edge) for edge in raw.split(',') if edge.strip()})
+        except ValueError:
+            edges = []
+        if 0 < len(edges) <= settings.PRODUCT_PRICE_FACET_MAX_BUCKETS:
+            return edges
+    return sorted(settings.PRODUCT_PRICE_FACET_BUCKETS)
+
+
+def _price_bucket_expression(edges):
+    whens = [When(price__lt=edge, then=Value(index)) for index, edge in enumerate(edges)]
+    return Case(*whens, default=Value(len(edges)), output_field=IntegerField())
+
+
+def _facets_version():
+    version = cache.get(FACETS_VERSION_KEY)
+    if version is None:
+        cache.add(FACETS_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(FACETS_VERSION_KEY)
+    return version
+
+
+def invalidate_facets():
+    cache.set(FACETS_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def facets_cache_key(params):
+    # Only the filters ProductFilter declares and the bucket edges in use make
+    # up the key, so unknown parameters cannot mint new entries.
+    items = sorted(
+        (key, value)
+        for key in ProductFilter.base_filters if key in params
+        for value in params.getlist(key)
+    )
+    items.append(('price_buckets', ','.join(map(str, get_price_buckets(params)))))
+    digest = hashlib.md5(urlencode(items).encode()).hexdigest()
+    return f'product:facets:{_facets_version()}:{digest}'
+
+
+def compute_facets(queryset, edges):
+    # One GROUP BY (category, price bucket); both facets are folded from it.
+    rows = queryset.order_by().values('category_id', bucket=_price_bucket_expression(edges)).annotate(count=Count('id'))
+    category_counts = {}
+    bucket_counts = [0] * (len(edges) + 1)
+    for row in rows:
+        category_counts[row['category_id']] = category_counts.get(row['category_id'], 0) + row['count']
+        bucket_counts[row['bucket']] += row['count']
+
+    category_names = get_categories()
+    categories = [
+        {'id': category_id, 'name': category_names.get(category_id), 'count': count}
+        for category_id, count in sorted(category_counts.items(), key=lambda item: (-item[1], item[0]))
+    ]
+    bounds = [None] + list(edges) + [None]
+    prices = [
+        {'min': bounds[index], 'max': bounds[index + 1], 'count': count}
+        for index, count in enumerate(bucket_counts)
+    ]
+    return {'categories': categories, 'price': prices}
+
+
+def get_product_facets(queryset, params):
+    key = facets_cache_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset, get_price_buckets(params))
+        cache.set(key, facets, settings.PRODUCT_FACETS_CACHE_TIMEOUT)
+    return facets
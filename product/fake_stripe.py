@@ -0,0 +1,272 @@
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+ENDPOINTS = [
+    ('POST', '/v1/products', 'create_product'),
+    ('POST', '/v1/products/{id}', 'update_product'),
+    ('POST', '/v1/prices', 'create_price'),
+    ('POST', '/v1/checkout/sessions', 'create_session'),
+    ('GET', '/v1/checkout/sessions/{id}', 'retrieve_session'),
+]
+ROUTES = [
+    (method, re.compile('^' + path.replace('{id}', r'(?P<id>[\w-]+)') + '$'), f'{method} {path}', handler)
+    for method, path, handler in ENDPOINTS
+]
+
+
+class FakeStripe:
+    # In-process stand-in for the parts of the Stripe API we call. Point the
+    # SDK at it with stripe.api_base = fake.url (or STRIPE_API_BASE); `calls`
+    # counts requests per endpoint ('POST /v1/checkout/sessions') and
+    # `requests` keeps the decoded form bodies.
+    #
+    # For load tests every request can be delayed by latency + up to jitter
+    # seconds, fail with a 500 at error_rate, or get Stripe's 429 once more
+    # than max_rps requests per second arrive. With a webhook_url each
+    # created checkout session is completed webhook_delay seconds later and a
+    # checkout.session.completed event, signed with webhook_secret, is posted
+    # there.
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, max_rps=None,
+                 webhook_url=None, webhook_secret='', webhook_delay=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.webhook_delay = webhook_delay
+        self.calls = Counter()
+        self.requests = []
+        self.rejected = Counter()
+        self.webhooks = Counter()
+        self.objects = {}
+        self.random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._idempotent = {}
+        self._tokens = max_rps or 0
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+            self.requests.clear()
+            self.rejected.clear()
+            self.webhooks.clear()
+
+    def new_id(self, prefix):
+        return f'{prefix}_fake{next(self._ids)}'
+
+    # endpoints
+
+    def create_product(self, params):
+        product = {'id': self.new_id('prod'), 'object': 'product', 'name': params.get('name'), 'default_price': None}
+        if 'default_price_data[unit_amount]' in params:
+            _, price = self.create_price({
+                'product': product['id'],
+                'currency': params.get('default_price_data[currency]'),
+                'unit_amount': params['default_price_data[unit_amount]'],
+            })
+            product['default_price'] = price['id']
+        self.objects[product['id']] = product
+        return 200, product
+
+    def update_product(self, params, id):
+        product = self.objects.get(id)
+        if product is None:
+            return 404, {'error': {'type': 'invalid_request_error', 'message': f'No such product: {id}'}}
+        product.update({name: value for name, value in params.items() if name in ('name', 'default_price', 'active')})
+        return 200, product
+
+    def create_price(self, params):
+        price = {
+            'id': self.new_id('price'),
+            'object': 'price',
+            'product': params.get('product'),
+            'currency': params.get('currency'),
+            'unit_amount': int(params.get('unit_amount', 0)),
+        }
+        self.objects[price['id']] = price
+        return 200, price
+
+    def line_items(self, params):
+        # line_items[0][price_data][unit_amount] -> [{'price_data.unit_amount': ...}]
+        items = {}
+        for name, value in params.items():
+            match = re.match(r'^line_items\[(\d+)\]\[(.+)\]$', name)
+            if match:
+                items.setdefault(int(match.group(1)), {})[match.group(2).replace('][', '.')] = value
+        return [items[index] for index in sorted(items)]
+
+    def create_session(self, params):
+        session_id = self.new_id('cs_test')
+        amount = 0
+        for item in self.line_items(params):
+            price = self.objects.get(item.get('price'), {})
+            unit_amount = item.get('price_data.unit_amount', price.get('unit_amount', 0))
+            amount += int(unit_amount) * int(item.get('quantity', 1))
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'mode': params.get('mode'),
+            'status': 'open',
+            'payment_status': 'unpaid',
+            'amount_total': amount,
+            'currency': 'usd',
+            'url': f'{self.url}/pay/{session_id}',
+            'success_url': params.get('success_url'),
+            'cancel_url': params.get('cancel_url'),
+        }
+        self.objects[session_id] = session
+        if self.webhook_url:
+            timer = threading.Timer(self.webhook_delay, self.complete_session, [session_id])
+            timer.daemon = True
+            timer.start()
+        return 200, session
+
+    def retrieve_session(self, params, id):
+        session = self.objects.get(id)
+        if session is None:
+            return 404, {'error': {'type': 'invalid_request_error', 'message': f'No such checkout.session: {id}'}}
+        return 200, session
+
+    # webhooks
+
+    def complete_session(self, session_id):
+        with self._lock:
+            session = self.objects[session_id]
+            session.update(status='complete', payment_status='paid')
+            session = dict(session)
+        return self.send_webhook('checkout.session.completed', session)
+
+    def sign(self, payload, timestamp=None):
+        # Stripe-Signature header value that stripe.Webhook.construct_event accepts.
+        timestamp = int(time.time()) if timestamp is None else timestamp
+        signature = hmac.new(
+            self.webhook_secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256,
+        ).hexdigest()
+        return f't={timestamp},v1={signature}'
+
+    def send_webhook(self, event_type, data):
+        event = {
+            'id': self.new_id('evt'),
+            'object': 'event',
+            'type': event_type,
+            'created': int(time.time()),
+            'livemode': False,
+            'data': {'object': data},
+        }
+        payload = json.dumps(event)
+        request = urllib.request.Request(
+            self.webhook_url, data=payload.encode(), method='POST',
+            headers={'Content-Type': 'application/json', 'Stripe-Signature': self.sign(payload)},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                status = response.status
+        except urllib.error.HTTPError as exc:
+            status = exc.code
+        except OSError:
+            status = 'unreachable'
+        with self._lock:
+            self.webhooks[status] += 1
+        return status
+
+    # transport
+
+    def admit(self):
+        # Token bucket of max_rps tokens refilled at max_rps per second.
+        if not self.max_rps:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.max_rps, self._tokens + (now - self._checked) * self.max_rps)
+        self._checked = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def dispatch(self, method, path, params, idempotency_key=None):
+        for route_method, pattern, label, handler in ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            return 404, {'error': {'type': 'invalid_request_error', 'message': f'Unrecognized request URL ({method}: {path})'}}
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.calls[label] += 1
+            self.requests.append((method, path, params))
+            if not self.admit():
+                self.rejected['rate_limited'] += 1
+                return 429, {'error': {'type': 'rate_limit_error', 'message': 'Too many requests hit the API too quickly.'}}
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.rejected['errors'] += 1
+                return 500, {'error': {'type': 'api_error', 'message': 'Injected failure.'}}
+            if idempotency_key in self._idempotent:
+                return self._idempotent[idempotency_key]
+            result = getattr(self, handler)(params, **match.groupdict())
+            if idempotency_key:
+                self._idempotent[idempotency_key] = result
+            return result
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def respond(self, method, params):
+                status, payload = fake.dispatch(
+                    method, urlsplit(self.path).path, params, self.headers.get('Idempotency-Key'),
+                )
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Request-Id', fake.new_id('req'))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self.respond('GET', dict(parse_qsl(urlsplit(self.path).query)))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+                self.respond('POST', dict(parse_qsl(body)))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -1,12 +1,29 @@
 import django_filters
+from .cache import get_categories
 from .models import Product
 
 
+class CategoryChoiceFilter(django_filters.ChoiceFilter):
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('field_name', 'category_id')
+        kwargs.setdefault('choices', lambda: sorted(get_categories().items()))
+        super().__init__(*args, **kwargs)
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
 class ProductFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(lookup_expr='iexact')
+    name__startswith = django_filters.CharFilter(field_name='name', lookup_expr='startswith')
+    category = CategoryChoiceFilter()
+    category__in = NumberInFilter(field_name='category_id', lookup_expr='in')
+    vendor__in = NumberInFilter(field_name='vendor_id', lookup_expr='in')
 
     class Meta:
         model = Product
-        fields = ['price', 'category']
-
-
+        fields = {
+            'price': ['exact', 'gte', 'lte'],
+        }
@@ -0,0 +1,57 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import Job
+from core.queue import job
+from .cache import warm_product_detail
+from .changes import compact
+from .partitions import add_months, ensure_partitions, is_partitioned, month_start
+from .payments import sync_products
+from .purge import purge_deleted
+
+
+@job
+def warm_product_cache(product_id):
+    warm_product_detail(product_id)
+
+
+@job
+def purge_deleted_rows():
+    purge_deleted()
+
+
+@job
+def compact_product_changes():
+    compact()
+
+
+@job
+def refresh_recommendations(full=False):
+    # Imported here so web processes never load numpy/scipy.
+    from .recommendations import refresh
+
+    refresh(full)
+
+
+@job(queue='payments')
+def sync_stripe_products():
+    sync_products()
+
+
+@job
+def create_comment_partitions():
+    # Monthly: every run queues the next one for the start of next month.
+    if is_partitioned():
+        ensure_partitions()
+    schedule_comment_partitions()
+
+
+def schedule_comment_partitions():
+    if settings.JOBS_ALWAYS_EAGER:
+        return None
+    if Job.objects.filter(name=create_comment_partitions.job_name, status=Job.QUEUED).exists():
+        return None
+    next_month = add_months(month_start(timezone.localdate()), 1)
+    return create_comment_partitions.schedule(timezone.make_aware(datetime.datetime.combine(next_month, datetime.time.min)))
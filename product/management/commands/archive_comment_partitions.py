@@ -0,0 +1,45 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from product.partitions import (
+    add_months, archive_partition, detach_partition, is_partitioned, month_start, partitions, recent_since,
+)
+
+
+def month(value):
+    return datetime.datetime.strptime(value, '%Y-%m').date()
+
+
+class Command(BaseCommand):
+    help = (
+        'Detach the comment partitions of months before --before (default: COMMENT_ARCHIVE_MONTHS ago) '
+        'and archive each (or earlier detached ones) to a gzipped CSV in COMMENT_ARCHIVE_DIR before dropping it. '
+        'Comment rollups keep their counts; do not re-roll archived days.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=month, help='First month to keep, YYYY-MM')
+        parser.add_argument('--detach-only', action='store_true', help='Detach but keep the tables')
+        parser.add_argument('--dir', help='Archive directory (default: COMMENT_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError('The comment table is not partitioned (PostgreSQL only, see product migration 0017)')
+        before = options['before'] or add_months(month_start(timezone.localdate()), -settings.COMMENT_ARCHIVE_MONTHS)
+        if before > recent_since():
+            raise CommandError(f'{before:%Y-%m} is inside the COMMENT_RECENT_MONTHS window product pages read')
+        for partition_month, name, rows, attached in partitions():
+            if partition_month >= before or (options['detach_only'] and not attached):
+                continue
+            if options['dry_run']:
+                self.stdout.write(f'Would {"detach" if options["detach_only"] else "archive"} {name} (~{rows} rows)')
+            elif options['detach_only']:
+                detach_partition(partition_month)
+                self.stdout.write(f'Detached {name}')
+            else:
+                path = archive_partition(partition_month, options['dir'])
+                self.stdout.write(f'Archived {name} to {path}')
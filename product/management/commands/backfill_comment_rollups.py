@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily comment rollups from the whole comment history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=31, help='Days re-rolled per transaction')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(start, end, total):
+            self.stdout.write(f'{start}..{end}: {total} buckets so far')
+
+        total = backfill(options['days'], progress)
+        self.stdout.write(f'Wrote {total} buckets in {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,63 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core.cache import _redis
+from core.loadgen import LoadResult
+from product.autocomplete import clear, rebuild, suggest
+
+ADJECTIVES = ['red', 'blue', 'black', 'white', 'green', 'mini', 'pro', 'ultra', 'smart', 'classic', 'wireless', 'steel']
+NOUNS = ['phone', 'case', 'charger', 'laptop', 'watch', 'kettle', 'lamp', 'chair', 'headphones', 'camera', 'mouse', 'desk']
+BRANDS = ['acme', 'globex', 'initech', 'umbrella', 'hooli', 'stark', 'wayne', 'tyrell', 'cyberdyne', 'soylent']
+
+
+def product_name(index):
+    rng = random.Random(index)
+    return f'{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.randint(1, 9999)}'
+
+
+class Command(BaseCommand):
+    help = 'Index synthetic product names in a separate Redis namespace and measure suggest() latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=20000)
+        parser.add_argument('--keep', action='store_true', help='Leave the benchmark index in Redis')
+
+    def handle(self, *args, **options):
+        connection = _redis()
+        if connection is None:
+            raise CommandError('The default cache is not a Redis cache')
+        rows = ((index, product_name(index), random.randint(0, 1000)) for index in range(1, options['products'] + 1))
+        queries = []
+        for index in random.choices(range(1, options['products'] + 1), k=options['queries']):
+            words = product_name(index).split(' ')
+            start = random.randrange(len(words))
+            tail = ' '.join(words[start:])
+            queries.append(tail[:random.randint(1, len(tail))])
+
+        with override_settings(AUTOCOMPLETE_KEY_PREFIX='autocomplete-bench'):
+            memory = connection.info('memory')['used_memory']
+            started = time.perf_counter()
+            count = rebuild(rows=rows, batch_size=5000)
+            self.stdout.write(
+                f'Indexed {count} names in {time.perf_counter() - started:.1f}s, '
+                f'{(connection.info("memory")["used_memory"] - memory) / 2 ** 20:.0f} MiB'
+            )
+
+            latencies, empty = [], 0
+            started = time.perf_counter()
+            for query in queries:
+                query_started = time.perf_counter()
+                if not suggest(query):
+                    empty += 1
+                latencies.append(time.perf_counter() - query_started)
+            summary = LoadResult(latencies, 0, time.perf_counter() - started).summary()
+            self.stdout.write(
+                f'suggest {summary["rps"]:>10} queries/s mean={summary["mean_ms"]}ms '
+                f'p50={summary["p50_ms"]}ms p99={summary["p99_ms"]}ms empty={empty}'
+            )
+            if not options['keep']:
+                clear()
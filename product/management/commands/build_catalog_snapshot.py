@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product.snapshots import build_snapshot, read_manifest
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the product catalog into precompressed JSON shards per category and page. '
+        'Only categories with changed products are rebuilt unless --full is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every category')
+        parser.add_argument('--interval', type=float, help='Keep running and rebuild every INTERVAL seconds')
+
+    def build(self, full):
+        started = time.perf_counter()
+        rebuilt = build_snapshot(full=full)
+        manifest = read_manifest()
+        shards = sum(category['pages'] for category in manifest['categories'].values())
+        size = sum(category['bytes'] for category in manifest['categories'].values())
+        self.stdout.write(
+            f'Rebuilt {len(rebuilt)} categories in {time.perf_counter() - started:.2f}s; '
+            f'snapshot has {shards} shards, {size / 1024:.0f} KiB uncompressed'
+        )
+
+    def handle(self, *args, **options):
+        self.build(options['full'])
+        while options['interval']:
+            time.sleep(options['interval'])
+            self.build(False)
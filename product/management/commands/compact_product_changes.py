@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product.changes import compact
+from product.models import ProductChange
+
+
+class Command(BaseCommand):
+    help = 'Drop superseded product change log rows and expired delete tombstones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--retention', type=int, help='Seconds to keep delete tombstones')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        before = ProductChange.objects.count()
+        removed = compact(options['batch_size'], options['retention'])
+        self.stdout.write(
+            f'Removed {removed["superseded"]} superseded and {removed["expired"]} expired rows '
+            f'({before} -> {before - sum(removed.values())}) in {time.perf_counter() - started:.1f}s'
+        )
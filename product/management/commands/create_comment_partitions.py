@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from product.jobs import schedule_comment_partitions
+from product.partitions import ensure_partitions, is_partitioned, partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the monthly comment partitions for this month and the next COMMENT_PARTITIONS_AHEAD '
+        '(or --ahead) months, moving matching rows out of the default partition, and list them. '
+        'Also queues the monthly create_comment_partitions job if it is not queued yet.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, help='Months after this one')
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError('The comment table is not partitioned (PostgreSQL only, see product migration 0017)')
+        for name in ensure_partitions(options['ahead']):
+            self.stdout.write(f'Created {name}')
+        if schedule_comment_partitions():
+            self.stdout.write('Queued the monthly create_comment_partitions job')
+        for month, name, rows, attached in partitions():
+            self.stdout.write(f'{month:%Y-%m}  {name}  ~{rows} rows{"" if attached else "  (detached)"}')
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core.loadgen import run_load, runserver_command, start_server, wait_for_server
+from product.fake_stripe import FakeStripe
+from product.models import Cart, CartItem, Product, StripeProduct
+from product.payments import sync_products
+from user.models import Customer
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test buy-product-cart and buy-product against the fake Stripe API with concurrent carts. '
+        'Starts the fake (unless --stripe-url) and an app server pointed at it through '
+        'ANANAS_STRIPE_API_BASE (unless --url). Each cart checks out from its own client address '
+        '(X-Forwarded-For), so the "checkout" throttle applies per cart; 429s are reported separately.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--carts', type=int, default=500)
+        parser.add_argument('--items', type=int, default=3, help='Products per cart')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--connections', type=int, default=50)
+        parser.add_argument(
+            '--product-share', type=float, default=0.0,
+            help='Share of single product checkouts (buy-product requires authentication, see --token)',
+        )
+        parser.add_argument('--token', help='JWT access token sent with buy-product requests')
+        parser.add_argument('--url', help='Load an already running app server (started with ANANAS_STRIPE_API_BASE)')
+        parser.add_argument(
+            '--cmd', default=runserver_command(),
+            help='Server command, {port} is filled in, e.g. "gunicorn ananas.wsgi:application --workers 4 --threads 8 '
+                 '--bind 127.0.0.1:{port}"',
+        )
+        parser.add_argument('--port', type=int, default=8104)
+        parser.add_argument('--stripe-url', help='Use an already running `run_fake_stripe` server')
+        parser.add_argument('--latency', type=float, default=50.0, help='Fake Stripe milliseconds per request')
+        parser.add_argument('--jitter', type=float, default=20.0, help='Fake Stripe extra random milliseconds')
+        parser.add_argument('--error-rate', type=float, default=0.0)
+        parser.add_argument('--max-rps', type=float, help='Fake Stripe rate limit (requests per second)')
+        parser.add_argument(
+            '--sync', action='store_true',
+            help='Sync products to the fake first. The mappings are stored for the fake API base only and removed '
+                 'afterwards unless --keep-data; the real Stripe mappings are left alone',
+        )
+        parser.add_argument('--keep-data', action='store_true', help='Keep the loadtest customers and carts afterwards')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def carts(self, options, rng):
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True)[:1000])
+        if len(product_ids) < options['items']:
+            raise CommandError(f'Need at least {options["items"]} products')
+        customer_ids = []
+        for index in range(options['carts']):
+            customer, _ = Customer.objects.get_or_create(email=f'loadtest{index}@example.com', defaults={
+                'name': 'load', 'second_name': 'test', 'phone_number': '0', 'card_number': '0',
+                'address': 'load test', 'post_code': '0',
+            })
+            cart, _ = Cart.objects.get_or_create(customer=customer)
+            if not CartItem.objects.filter(cart=cart).exists():
+                for product_id in rng.sample(product_ids, options['items']):
+                    CartItem.objects.create(cart=cart, product_id=product_id, quantity=rng.randint(1, 3))
+            customer_ids.append(customer.id)
+        return customer_ids, product_ids
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        customer_ids, product_ids = self.carts(options, rng)
+        self.cleanup = []
+        try:
+            self.run(options, rng, customer_ids, product_ids)
+        finally:
+            for cleanup in self.cleanup:
+                cleanup()
+            if not options['keep_data']:
+                Customer.objects.filter(id__in=customer_ids).delete()
+                self.stdout.write(f'Removed {len(customer_ids)} loadtest customers and their carts')
+
+    def run(self, options, rng, customer_ids, product_ids):
+        fake = None
+        stripe_url = options['stripe_url']
+        if stripe_url is None:
+            fake = FakeStripe(
+                latency=options['latency'] / 1000,
+                jitter=options['jitter'] / 1000,
+                error_rate=options['error_rate'],
+                max_rps=options['max_rps'],
+                seed=options['seed'],
+            ).start()
+            stripe_url = fake.url
+        if options['sync']:
+            with override_settings(STRIPE_API_BASE=stripe_url):
+                self.stdout.write(f'synced: {sync_products()}')
+            if not options['keep_data']:
+                self.cleanup.append(lambda: StripeProduct.objects.filter(api_base=stripe_url).delete())
+
+        process = None
+        base_url = options['url'] or f'http://127.0.0.1:{options["port"]}'
+
+        def request(index):
+            customer_id = rng.choice(customer_ids)
+            headers = {'X-Forwarded-For': f'10.{customer_id // 65536 % 256}.{customer_id // 256 % 256}.{customer_id % 256}'}
+            if rng.random() < options['product_share']:
+                if options['token']:
+                    headers['Authorization'] = f'Bearer {options["token"]}'
+                return 'GET', f'{base_url}/api/product/buy-product/{rng.choice(product_ids)}/{customer_id}/', b'', headers
+            return 'POST', f'{base_url}/api/product/buy-product-cart/{customer_id}/', b'', headers
+
+        try:
+            if options['url'] is None:
+                process = start_server(
+                    options['cmd'].format(port=options['port']),
+                    env={**os.environ, 'ANANAS_STRIPE_API_BASE': stripe_url},
+                )
+            if not wait_for_server(f'{base_url}/api/product/avp/'):
+                raise CommandError(f'App server at {base_url} did not start')
+            result = asyncio.run(run_load(base_url, options['requests'], options['connections'], request_factory=request))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+            if fake is not None:
+                fake.stop()
+
+        summary = result.summary()
+        self.stdout.write(' '.join(f'{name}={value}' for name, value in summary.items()))
+        self.stdout.write(f'statuses: {dict(sorted(result.statuses.items()))}')
+        if fake is not None:
+            self.stdout.write(f'stripe calls: {dict(fake.calls)} rejected: {dict(fake.rejected)}')
+        if result.statuses[429]:
+            self.stdout.write(self.style.WARNING(
+                f'{result.statuses[429]} requests were throttled by the app; use more --carts or raise '
+                f'THROTTLE_BUCKETS["checkout"] on the server under test',
+            ))
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from product.purge import purge_backlog, purge_deleted
+
+
+class Command(BaseCommand):
+    help = 'Delete soft-deleted products and vendors with their dependents in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=settings.PURGE_BATCH_PAUSE,
+                            help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only show what is waiting to be purged')
+
+    def handle(self, *args, **options):
+        backlog = purge_backlog()
+        self.stdout.write(f'Waiting: {backlog["products"]} products, {backlog["vendors"]} vendors')
+        if options['dry_run']:
+            return
+        started = time.perf_counter()
+
+        def progress(totals):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{elapsed:7.1f}s ' + ', '.join(f'{label}={count}' for label, count in sorted(totals.items())))
+
+        totals = purge_deleted(options['batch_size'], options['pause'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {", ".join(f"{count} {label}" for label, count in sorted(totals.items())) or "nothing"} '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
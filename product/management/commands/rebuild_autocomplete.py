@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache import _redis
+from product.autocomplete import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the Redis autocomplete index from the products, scored by how many carts hold them. '
+        'The old index keeps answering until the new one is swapped in.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if _redis() is None:
+            raise CommandError('The default cache is not a Redis cache')
+        started = time.perf_counter()
+        count = rebuild(options['batch_size'])
+        self.stdout.write(f'Indexed {count} products in {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from product.fake_stripe import FakeStripe
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the local fake Stripe API (checkout sessions, products, prices) until interrupted. '
+        'Start the app with ANANAS_STRIPE_API_BASE set to the printed URL to send its Stripe calls here.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency', type=float, default=0.0, help='Milliseconds added to every request')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many extra random milliseconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+        parser.add_argument('--max-rps', type=float, help='Answer 429 above this many requests per second')
+        parser.add_argument('--webhook-url', help='Post checkout.session.completed events here')
+        parser.add_argument('--webhook-delay', type=float, default=1.0, help='Seconds from session to event')
+
+    def handle(self, *args, **options):
+        fake = FakeStripe(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'] / 1000,
+            jitter=options['jitter'] / 1000,
+            error_rate=options['error_rate'],
+            max_rps=options['max_rps'],
+            webhook_url=options['webhook_url'],
+            webhook_secret=settings.STRIPE_WEBHOOK_SECRET,
+            webhook_delay=options['webhook_delay'],
+        )
+        self.stdout.write(f'Fake Stripe listening on {fake.url}')
+        try:
+            fake.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            fake.server.server_close()
+        self.stdout.write(f'calls: {dict(fake.calls)}')
+        self.stdout.write(f'rejected: {dict(fake.rejected)}')
+        if options['webhook_url']:
+            self.stdout.write(f'webhooks: {dict(fake.webhooks)}')
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0009_product_browse_indexes'),
+    ]
+
+    # The auto-created cart/product table is kept as is and adopted by CartItem,
+    # so existing cart rows survive; only the quantity column is really added.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='CartItem',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.cart')),
+                        ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.product')),
+                    ],
+                    options={
+                        'db_table': 'product_cart_product',
+                        'unique_together': {('cart', 'product')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='cart',
+                    name='product',
+                    field=models.ManyToManyField(through='product.CartItem', to='product.product'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='quantity',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
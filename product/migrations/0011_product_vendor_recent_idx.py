@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-19 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0010_cartitem'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['vendor', '-id'], name='product_vendor_recent_idx'),
+        ),
+    ]
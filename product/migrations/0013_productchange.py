@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-19 19:43
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    # Existing products enter the feed as creates, so since=0 is a full sync.
+    Product = apps.get_model('product', 'Product')
+    ProductChange = apps.get_model('product', 'ProductChange')
+    products = Product.objects.filter(deleted_at__isnull=True).select_related('category').order_by('id')
+    batch = []
+    for product in products.iterator(chunk_size=1000):
+        batch.append(ProductChange(product_id=product.id, action='create', data={
+            'id': product.id,
+            'category_name': product.category.name,
+            'name': product.name,
+            'description': product.description,
+            'price': product.price,
+            'vendor': product.vendor_id,
+            'category': product.category_id,
+        }))
+        if len(batch) == 1000:
+            ProductChange.objects.bulk_create(batch)
+            batch = []
+    ProductChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0012_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('product_id', models.IntegerField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=10)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='productchange',
+            index=models.Index(fields=['product_id', 'id'], name='product_change_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productchange',
+            index=models.Index(fields=['action', 'created_at'], name='product_change_action_idx'),
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-19 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0014_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('product_id', models.IntegerField()),
+                ('vendor_id', models.IntegerField()),
+                ('comments', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='commentrollup',
+            index=models.Index(fields=['product_id', 'day'], name='comment_rollup_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commentrollup',
+            index=models.Index(fields=['vendor_id', 'day'], name='comment_rollup_vendor_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='commentrollup',
+            unique_together={('day', 'product_id')},
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-19 19:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0015_commentrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeProduct',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stripe', serialize=False, to='product.product')),
+                ('stripe_product_id', models.CharField(max_length=255)),
+                ('stripe_price_id', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('price', models.IntegerField()),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2 on 2026-10-19 20:05
+
+import datetime
+
+from django.db import migrations, models
+
+AHEAD = 3
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_comments(apps, schema_editor):
+    # Rebuilds product_comment as a table range partitioned by month on
+    # created_date, one partition per month from the oldest comment to AHEAD
+    # months out and a default partition for anything else. PostgreSQL wants
+    # the partition key in the primary key, so it becomes (id, created_date);
+    # ids stay unique through the identity sequence. Other databases keep the
+    # plain table. The rename holds ACCESS EXCLUSIVE on the comment table
+    # until the copy below commits, so comments are unavailable for the
+    # length of the copy; run it in a maintenance window.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT min(created_date), pg_get_serial_sequence(%s, %s) FROM product_comment', ['product_comment', 'id'])
+        oldest, sequence = cursor.fetchone()
+
+    execute('ALTER TABLE product_comment RENAME TO product_comment_unpartitioned')
+    execute('ALTER TABLE product_comment_unpartitioned RENAME CONSTRAINT product_comment_pkey TO product_comment_unpartitioned_pkey')
+    if sequence:
+        execute(f'ALTER SEQUENCE {sequence} RENAME TO product_comment_unpartitioned_id_seq')
+    execute(
+        'CREATE TABLE product_comment ('
+        ' id bigint GENERATED BY DEFAULT AS IDENTITY,'
+        ' author varchar(100) NOT NULL,'
+        ' text text NOT NULL,'
+        ' created_date date NOT NULL,'
+        ' product_id bigint NOT NULL,'
+        ' CONSTRAINT product_comment_pkey PRIMARY KEY (id, created_date),'
+        ' CONSTRAINT product_comment_product_id_fk_product_product_id FOREIGN KEY (product_id)'
+        ' REFERENCES product_product (id) DEFERRABLE INITIALLY DEFERRED'
+        ') PARTITION BY RANGE (created_date)'
+    )
+    execute('CREATE TABLE product_comment_default PARTITION OF product_comment DEFAULT')
+
+    current = datetime.date.today().replace(day=1)
+    month = min(oldest.replace(day=1), current) if oldest else current
+    while month <= add_months(current, AHEAD):
+        execute(
+            f'CREATE TABLE product_comment_{month:%Y%m} PARTITION OF product_comment '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        month = add_months(month, 1)
+
+    execute(
+        'INSERT INTO product_comment (id, author, text, created_date, product_id) '
+        'SELECT id, author, text, created_date, product_id FROM product_comment_unpartitioned'
+    )
+    execute(
+        "SELECT setval(pg_get_serial_sequence('product_comment', 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) "
+        'FROM product_comment'
+    )
+    execute('DROP TABLE product_comment_unpartitioned')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0016_stripeproduct'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_comments, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['product', 'created_date'], name='comment_product_date_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-19 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0017_comment_partitions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productchange',
+            name='product_id',
+            field=models.BigIntegerField(),
+        ),
+        # Existing rows keep txid 0, so plain-id cursors handed out before
+        # this migration still resume at the right place.
+        migrations.AddField(
+            model_name='productchange',
+            name='txid',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='productchange',
+            index=models.Index(fields=['txid', 'id'], name='product_change_txid_idx'),
+        ),
+        migrations.CreateModel(
+            name='ProductChangeHorizon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txid', models.BigIntegerField(default=0)),
+                ('change_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 21:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0018_productchange_txid'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='commentrollup',
+            name='product_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='commentrollup',
+            name='vendor_id',
+            field=models.BigIntegerField(),
+        ),
+    ]
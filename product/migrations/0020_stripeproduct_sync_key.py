@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-19 21:30
+
+import uuid
+
+from django.db import migrations, models
+
+
+def fill_sync_keys(apps, schema_editor):
+    StripeProduct = apps.get_model('product', 'StripeProduct')
+    for mapping in StripeProduct.objects.only('pk').iterator(chunk_size=1000):
+        StripeProduct.objects.filter(pk=mapping.pk).update(sync_key=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0019_commentrollup_bigint_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stripeproduct',
+            name='sync_key',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_sync_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='stripeproduct',
+            name='sync_key',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
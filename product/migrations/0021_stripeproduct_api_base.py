@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0020_stripeproduct_sync_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stripeproduct',
+            name='api_base',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
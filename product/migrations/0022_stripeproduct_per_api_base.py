@@ -0,0 +1,53 @@
+# Generated by Django 4.2 on 2026-10-20 09:10
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TABLE = 'product_stripeproduct'
+
+
+class Migration(migrations.Migration):
+    # StripeProduct gets its own id so a product can have one mapping per
+    # STRIPE_API_BASE. Existing rows (all made against the configured base)
+    # are kept in place; only the primary key moves.
+
+    dependencies = [
+        ('product', '0021_stripeproduct_api_base'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    f'ALTER TABLE {TABLE} DROP CONSTRAINT {TABLE}_pkey; '
+                    f'ALTER TABLE {TABLE} ADD COLUMN id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY; '
+                    f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_product_id_api_base_uniq UNIQUE (product_id, api_base);',
+                    f'ALTER TABLE {TABLE} DROP CONSTRAINT {TABLE}_product_id_api_base_uniq; '
+                    f'ALTER TABLE {TABLE} DROP COLUMN id; '
+                    f'ALTER TABLE {TABLE} ADD PRIMARY KEY (product_id);',
+                ),
+            ],
+            state_operations=[
+                migrations.DeleteModel(name='StripeProduct'),
+                migrations.CreateModel(
+                    name='StripeProduct',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stripe_mappings', to='product.product')),
+                        ('api_base', models.CharField(blank=True, default='', max_length=255)),
+                        ('stripe_product_id', models.CharField(max_length=255)),
+                        ('stripe_price_id', models.CharField(max_length=255)),
+                        ('name', models.CharField(max_length=255)),
+                        ('price', models.IntegerField()),
+                        ('synced_at', models.DateTimeField(auto_now=True)),
+                        ('sync_key', models.UUIDField(default=uuid.uuid4, editable=False)),
+                    ],
+                    options={
+                        'unique_together': {('product', 'api_base')},
+                    },
+                ),
+            ],
+        ),
+    ]
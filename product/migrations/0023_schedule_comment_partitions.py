@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-20 09:40
+
+from django.db import migrations
+from django.utils import timezone
+
+JOB_NAME = 'product.jobs.create_comment_partitions'
+
+
+def queue_partition_job(apps, schema_editor):
+    # Starts the monthly create_comment_partitions chain; each run queues the
+    # next, so partitions keep being created ahead of the comments.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Job = apps.get_model('core', 'Job')
+    if not Job.objects.filter(name=JOB_NAME, status='queued').exists():
+        Job.objects.create(name=JOB_NAME, run_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('product', '0022_stripeproduct_per_api_base'),
+    ]
+
+    operations = [
+        migrations.RunPython(queue_partition_job, migrations.RunPython.noop),
+    ]
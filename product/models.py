@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from user.models import Vendor, Customer
 import datetime
+import uuid
 
 
 class Category(models.Model):
@@ -10,24 +13,93 @@ class Category(models.Model):
         return self.name
 
 
+class ProductManager(models.Manager):
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Product(models.Model):
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     name = models.CharField(max_length=255, null=False, blank=False)
     description = models.TextField()
     price = models.IntegerField(null=False, blank=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ProductManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+            models.Index(fields=['vendor', 'price'], name='product_vendor_price_idx'),
+            models.Index(fields=['vendor', '-id'], name='product_vendor_recent_idx'),
+            models.Index(fields=['name'], name='product_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['deleted_at'], name='product_deleted_idx', condition=Q(deleted_at__isnull=False)),
+        ]
 
     def __str__(self):
         return self.name
 
+    def soft_delete(self):
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at'])
+
 
 class Cart(models.Model):
     customer = models.OneToOneField(Customer, on_delete=models.CASCADE)
-    product = models.ManyToManyField(Product)
+    product = models.ManyToManyField(Product, through='CartItem')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.customer.email
 
+    def apply_operations(self, operations):
+        from .cache import invalidate_cart_summary
+
+        with transaction.atomic():
+            # Quantity updates go through queryset.update(), which sends no signals.
+            transaction.on_commit(lambda: invalidate_cart_summary(self.pk))
+            Cart.objects.filter(pk=self.pk).update(updated_at=timezone.now())
+            Cart.objects.select_for_update().only('id').get(pk=self.pk)
+            for operation in operations:
+                items = CartItem.objects.filter(cart=self, product_id=operation['product'])
+                quantity = operation.get('quantity')
+                if operation['op'] == 'add':
+                    item, created = CartItem.objects.get_or_create(
+                        cart=self, product_id=operation['product'], defaults={'quantity': quantity or 1}
+                    )
+                    if not created:
+                        items.update(quantity=F('quantity') + (quantity or 1))
+                elif operation['op'] == 'remove':
+                    if quantity:
+                        # Delete first: going below zero would break the quantity CHECK constraint.
+                        items.filter(quantity__lte=quantity).delete()
+                        items.update(quantity=F('quantity') - quantity)
+                    else:
+                        items.delete()
+                elif operation['op'] == 'set':
+                    if quantity:
+                        CartItem.objects.update_or_create(
+                            cart=self, product_id=operation['product'], defaults={'quantity': quantity}
+                        )
+                    else:
+                        items.delete()
+
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        db_table = 'product_cart_product'
+        unique_together = [['cart', 'product']]
+
+    def __str__(self):
+        return f'{self.product} x{self.quantity}'
+
 
 class Comment(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -35,6 +107,98 @@ class Comment(models.Model):
     text = models.TextField()
     created_date = models.DateField(default=datetime.date.today)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_date'], name='comment_product_date_idx'),
+        ]
+
     def __str__(self):
         return f'{self.author} comment'
 
+
+class CommentRollup(models.Model):
+    # Comments per product and day, kept current by product.rollups so
+    # analytics never scan the comment table. vendor_id is the product's
+    # vendor when the comments were counted.
+    day = models.DateField()
+    product_id = models.BigIntegerField()
+    vendor_id = models.BigIntegerField()
+    comments = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [['day', 'product_id']]
+        indexes = [
+            models.Index(fields=['product_id', 'day'], name='comment_rollup_product_idx'),
+            models.Index(fields=['vendor_id', 'day'], name='comment_rollup_vendor_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.comments} comments on product {self.product_id} at {self.day}'
+
+
+class ProductChange(models.Model):
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTIONS = [(CREATE, 'Create'), (UPDATE, 'Update'), (DELETE, 'Delete')]
+
+    id = models.BigAutoField(primary_key=True)
+    product_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    data = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # txid_current() of the writing transaction, the order product.changes reads in.
+    txid = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product_id', 'id'], name='product_change_product_idx'),
+            models.Index(fields=['action', 'created_at'], name='product_change_action_idx'),
+            models.Index(fields=['txid', 'id'], name='product_change_txid_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.action} product {self.product_id}'
+
+
+class ProductChangeHorizon(models.Model):
+    # Single row: the (txid, id) of the last delete tombstone compaction has
+    # pruned from the change log.
+    txid = models.BigIntegerField(default=0)
+    change_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.txid}.{self.change_id}'
+
+
+class ProductRecommendation(models.Model):
+    # Top-K "frequently carted together" neighbours of a product, as
+    # [[product_id, carts in common], ...], written by product.recommendations.
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='recommendation')
+    neighbours = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Recommendations for product {self.product_id}'
+
+
+class StripeProduct(models.Model):
+    # Stripe Product/Price ids of a product on one API base and the name and
+    # price they were created with; product.payments re-syncs rows that no
+    # longer match.
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stripe_mappings')
+    # STRIPE_API_BASE the ids belong to, '' for the real Stripe API.
+    api_base = models.CharField(max_length=255, blank=True, default='')
+    stripe_product_id = models.CharField(max_length=255)
+    stripe_price_id = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+    price = models.IntegerField()
+    synced_at = models.DateTimeField(auto_now=True)
+    # Scopes the Stripe idempotency keys of this mapping.
+    sync_key = models.UUIDField(default=uuid.uuid4, editable=False)
+
+    class Meta:
+        unique_together = [['product', 'api_base']]
+
+    def __str__(self):
+        return f'{self.product_id} -> {self.stripe_price_id}'
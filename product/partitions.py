@@ -0,0 +1,163 @@
+import datetime
+import gzip
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Comment
+
+# product_comment is range partitioned by month on created_date (PostgreSQL
+# only, see migration 0017): product_comment_YYYYMM partitions plus a default
+# partition catching dates no monthly partition covers.
+TABLE = Comment._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_RE = re.compile(rf'^{TABLE}_(\d{{4}})(\d{{2}})$')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_{month:%Y%m}'
+
+
+def recent_since(months=None):
+    # First day of the COMMENT_RECENT_MONTHS window (this month included)
+    # that product detail reads cover unless they ask for history.
+    months = settings.COMMENT_RECENT_MONTHS if months is None else months
+    return add_months(month_start(timezone.localdate()), 1 - months)
+
+
+def product_comments(product, history=False):
+    # The created_date bound lets PostgreSQL skip the older partitions.
+    comments = Comment.objects.filter(product=product)
+    if not history:
+        comments = comments.filter(created_date__gte=recent_since())
+    return comments
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = %s AND pg_table_is_visible(c.oid)',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def _exists(cursor, name):
+    cursor.execute('SELECT to_regclass(%s)', [name])
+    return cursor.fetchone()[0] is not None
+
+
+def _attached(cursor, name):
+    cursor.execute(
+        'SELECT 1 FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent '
+        'WHERE c.relname = %s AND p.relname = %s AND pg_table_is_visible(c.oid)',
+        [name, TABLE],
+    )
+    return cursor.fetchone() is not None
+
+
+def _bounds(month):
+    # Partition bounds must be literals; these are our own dates.
+    return f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+def partitions():
+    # [(month, name, estimated rows, attached)] of the monthly partitions,
+    # including detached ones not archived yet, oldest first.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, c.reltuples, i.inhrelid IS NOT NULL FROM pg_class c "
+            "LEFT JOIN pg_inherits i ON i.inhrelid = c.oid "
+            "WHERE c.relkind = 'r' AND c.relname LIKE %s AND pg_table_is_visible(c.oid) ORDER BY c.relname",
+            [f'{TABLE}_%'],
+        )
+        rows = cursor.fetchall()
+    result = []
+    for name, estimate, attached in rows:
+        match = PARTITION_RE.match(name)
+        if match:
+            month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+            result.append((month, name, max(0, int(estimate)), attached))
+    return result
+
+
+def create_partition(month):
+    # Comments of this month that landed in the default partition move into
+    # the new one; PostgreSQL will not attach a range the default still holds.
+    name = partition_name(month)
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        if _exists(cursor, name):
+            return False
+        cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} '
+            f'WHERE created_date >= %s AND created_date < %s RETURNING *) '
+            f'INSERT INTO {quote(name)} SELECT * FROM moved',
+            [month, add_months(month, 1)],
+        )
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} ATTACH PARTITION {quote(name)} FOR VALUES {_bounds(month)}')
+    return True
+
+
+def ensure_partitions(ahead=None):
+    # Creates the partitions of this month and the next `ahead` months.
+    ahead = settings.COMMENT_PARTITIONS_AHEAD if ahead is None else ahead
+    first = month_start(timezone.localdate())
+    months = [add_months(first, offset) for offset in range(ahead + 1)]
+    return [partition_name(month) for month in months if create_partition(month)]
+
+
+def detach_partition(month):
+    # The table stays around (unreadable through Comment) until archived or
+    # dropped. DETACH takes an ACCESS EXCLUSIVE lock on product_comment
+    # (CONCURRENTLY is not allowed next to a default partition), so it runs
+    # in its own transaction and gives up after COMMENT_DETACH_LOCK_TIMEOUT
+    # rather than queueing every comment read behind it.
+    name = partition_name(month)
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not _attached(cursor, name):
+            return False
+        cursor.execute('SELECT set_config(%s, %s, true)', ['lock_timeout', settings.COMMENT_DETACH_LOCK_TIMEOUT])
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}')
+    return True
+
+
+def archive_partition(month, directory=None):
+    # Detaches the month if still attached, writes it to
+    # <directory>/<partition>.csv.gz and drops the table. Returns the path,
+    # or None when there is no such partition. Only the detach locks
+    # product_comment; the export and the drop touch the detached table alone,
+    # and a failed export leaves it detached for the next run.
+    name = partition_name(month)
+    directory = Path(directory or settings.COMMENT_ARCHIVE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{name}.csv.gz'
+    partial = path.with_suffix('.part')
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if not _exists(cursor, name):
+            return None
+    detach_partition(month)
+    with connection.cursor() as cursor:
+        with gzip.open(partial, 'wb') as output:
+            cursor.copy_expert(f'COPY {quote(name)} TO STDOUT WITH (FORMAT csv, HEADER)', output)
+        partial.replace(path)
+        cursor.execute(f'DROP TABLE {quote(name)}')
+    return path
@@ -0,0 +1,155 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.models import Job
+from .models import Product, StripeProduct
+
+logger = logging.getLogger(__name__)
+
+CURRENCY = 'usd'
+
+
+def stripe_client():
+    # The Stripe SDK is large; import it on the first payment, not at boot.
+    import stripe
+
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    if settings.STRIPE_API_BASE:
+        stripe.api_base = settings.STRIPE_API_BASE
+    return stripe
+
+
+def api_base():
+    # '' is the real Stripe API. Every base (e.g. the load test fake) keeps
+    # its own mappings, so syncing against one never touches another's.
+    return settings.STRIPE_API_BASE or ''
+
+
+def price_key(product_id):
+    base = api_base()
+    return f'stripe:price:{base}:{product_id}' if base else f'stripe:price:{product_id}'
+
+
+def _price_entry(mapping):
+    return {'price': mapping.stripe_price_id, 'amount': mapping.price, 'name': mapping.name}
+
+
+def cached_prices(product_ids):
+    # {product_id: {'price', 'amount', 'name'}} of the products synced to this API base.
+    keys = {price_key(product_id): product_id for product_id in product_ids}
+    found = {keys[key]: entry for key, entry in cache.get_many(list(keys)).items()}
+    missing = [product_id for product_id in product_ids if product_id not in found]
+    if missing:
+        fresh = {mapping.product_id: _price_entry(mapping) for mapping in StripeProduct.objects.filter(product_id__in=missing, api_base=api_base())}
+        cache.set_many({price_key(product_id): entry for product_id, entry in fresh.items()}, settings.STRIPE_PRICE_CACHE_TIMEOUT)
+        found.update(fresh)
+    return found
+
+
+def checkout_line_items(lines):
+    # Stripe line items for summary lines ({'product', 'name', 'unit_price',
+    # 'quantity'}): the synced Price when it still matches, inline price_data
+    # (and a sync request) otherwise.
+    prices = cached_prices([line['product'] for line in lines])
+    line_items = []
+    stale = False
+    for line in lines:
+        entry = prices.get(line['product'])
+        if entry and entry['amount'] == line['unit_price'] and entry['name'] == line['name']:
+            line_items.append({'price': entry['price'], 'quantity': line['quantity']})
+            continue
+        stale = True
+        line_items.append({
+            'price_data': {
+                'currency': CURRENCY,
+                'product_data': {
+                    'name': line['name'],
+                },
+                'unit_amount': line['unit_price']
+            },
+            'quantity': line['quantity']
+        })
+    if stale:
+        request_sync()
+    return line_items
+
+
+def stale_products():
+    return Product.objects.exclude(Exists(StripeProduct.objects.filter(
+        product=OuterRef('pk'), api_base=api_base(), name=OuterRef('name'), price=OuterRef('price'),
+    )))
+
+
+def sync_product(product):
+    # The mapping row exists (empty, so still stale) before the first Stripe
+    # call. Overlapping syncs share it, and its sync_key makes the
+    # idempotency keys unique to this database rather than to product ids,
+    # which a reset database or another developer on the same Stripe test
+    # account would reuse.
+    stripe = stripe_client()
+    mapping, _ = StripeProduct.objects.get_or_create(product=product, api_base=api_base(), defaults={
+        'stripe_product_id': '', 'stripe_price_id': '', 'name': '', 'price': 0,
+    })
+    if not mapping.stripe_product_id:
+        remote = stripe.Product.create(
+            name=product.name,
+            default_price_data={'currency': CURRENCY, 'unit_amount': product.price},
+            metadata={'product_id': product.id},
+            idempotency_key=f'product-{mapping.sync_key}',
+        )
+        mapping.stripe_product_id = remote.id
+        mapping.stripe_price_id = remote.default_price
+    else:
+        changes = {}
+        if mapping.price != product.price:
+            # Prices are immutable in Stripe: create one and make it the default.
+            price = stripe.Price.create(
+                product=mapping.stripe_product_id,
+                currency=CURRENCY,
+                unit_amount=product.price,
+                idempotency_key=f'price-{mapping.sync_key}-{product.price}',
+            )
+            mapping.stripe_price_id = changes['default_price'] = price.id
+        if mapping.name != product.name:
+            changes['name'] = product.name
+        if changes:
+            stripe.Product.modify(mapping.stripe_product_id, **changes)
+    mapping.name = product.name
+    mapping.price = product.price
+    mapping.save()
+    cache.set(price_key(product.id), _price_entry(mapping), settings.STRIPE_PRICE_CACHE_TIMEOUT)
+
+
+def sync_products(batch_size=None):
+    # Pushes every product whose name or price differs from its Stripe
+    # Product/Price (or that has none yet), batch_size rows at a time.
+    stripe = stripe_client()
+    batch_size = batch_size or settings.STRIPE_SYNC_BATCH
+    synced = failed = 0
+    last = 0
+    while True:
+        batch = list(stale_products().filter(id__gt=last).order_by('id')[:batch_size])
+        if not batch:
+            break
+        for product in batch:
+            try:
+                sync_product(product)
+                synced += 1
+            except stripe.error.StripeError:
+                logger.warning('Stripe sync failed for product %s', product.id, exc_info=True)
+                failed += 1
+        last = batch[-1].id
+    return {'synced': synced, 'failed': failed}
+
+
+def request_sync():
+    # Coalesces bursts of product changes into one sync job a few seconds out.
+    from .jobs import sync_stripe_products
+
+    if not Job.objects.filter(name=sync_stripe_products.job_name, status=Job.QUEUED).exists():
+        sync_stripe_products.schedule(timezone.now() + timedelta(seconds=settings.STRIPE_SYNC_DELAY))
@@ -0,0 +1,65 @@
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from user.models import Vendor
+from .models import CartItem, Comment, CommentRollup, Product
+from .rollups import bumps_suspended
+
+logger = logging.getLogger(__name__)
+
+
+def purge_backlog():
+    return {
+        'products': Product.all_objects.filter(deleted_at__isnull=False).count(),
+        'vendors': Vendor.all_objects.filter(deleted_at__isnull=False).count(),
+    }
+
+
+def log_progress(totals):
+    logger.info('Purged %s', ', '.join(f'{count} {label}' for label, count in sorted(totals.items())))
+
+
+def delete_in_batches(queryset, label, totals, batch_size, pause, progress):
+    # Every batch is its own short transaction, so row locks are held for one
+    # batch at a time instead of for the whole cascade.
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return
+            queryset.model._base_manager.filter(pk__in=pks).delete()
+        totals[label] += len(pks)
+        progress(totals)
+        if pause:
+            time.sleep(pause)
+
+
+def purge_deleted(batch_size=None, pause=None, progress=log_progress):
+    # Removes soft-deleted products (with their comments and cart rows) and
+    # then soft-deleted vendors that have no products left.
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_BATCH_PAUSE if pause is None else pause
+    totals = Counter()
+    while True:
+        product_ids = list(
+            Product.all_objects.filter(deleted_at__isnull=False).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not product_ids:
+            break
+        # Every comment of these products goes, so their rollups are dropped
+        # once here instead of decremented per comment by the signals.
+        with bumps_suspended():
+            delete_in_batches(Comment.objects.filter(product_id__in=product_ids), 'comments', totals, batch_size, pause, progress)
+        CommentRollup.objects.filter(product_id__in=product_ids).delete()
+        delete_in_batches(CartItem.objects.filter(product_id__in=product_ids), 'cart items', totals, batch_size, pause, progress)
+        delete_in_batches(Product.all_objects.filter(pk__in=product_ids), 'products', totals, batch_size, pause, progress)
+
+    vendors = Vendor.all_objects.filter(deleted_at__isnull=False).exclude(
+        id__in=Product.all_objects.values('vendor_id'),
+    )
+    delete_in_batches(vendors, 'vendors', totals, batch_size, pause, progress)
+    return dict(totals)
@@ -0,0 +1,165 @@
+import datetime
+import itertools
+import logging
+import os
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from scipy import sparse
+
+from .models import Cart, CartItem, Product, ProductRecommendation
+
+logger = logging.getLogger(__name__)
+
+
+def state_path():
+    return settings.RECOMMENDATIONS_STATE
+
+
+def load_state():
+    # The cart x product membership and the product x product co-occurrence
+    # counts of the last run, so later runs only fold in the carts that changed.
+    try:
+        with np.load(state_path()) as state:
+            membership = sparse.csr_matrix(
+                (state['membership_data'], state['membership_indices'], state['membership_indptr']),
+                shape=tuple(state['membership_shape']),
+            )
+            counts = sparse.csr_matrix(
+                (state['counts_data'], state['counts_indices'], state['counts_indptr']),
+                shape=tuple(state['counts_shape']),
+            )
+            since = datetime.datetime.fromtimestamp(float(state['since']), tz=datetime.timezone.utc)
+    except (OSError, KeyError, ValueError):
+        return None
+    return membership, counts, since
+
+
+def save_state(membership, counts, since):
+    path = state_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp.npz')
+    np.savez(
+        tmp,
+        membership_data=membership.data, membership_indices=membership.indices,
+        membership_indptr=membership.indptr, membership_shape=membership.shape,
+        counts_data=counts.data, counts_indices=counts.indices,
+        counts_indptr=counts.indptr, counts_shape=counts.shape,
+        since=since.timestamp(),
+    )
+    os.replace(tmp, path)
+
+
+def matrix_shape():
+    carts = Cart.objects.aggregate(last=Max('id'))['last'] or 0
+    products = Product.all_objects.aggregate(last=Max('id'))['last'] or 0
+    return carts + 1, products + 1
+
+
+def load_membership(shape, cart_ids=None):
+    # Carts and products created after the shape was taken wait for the next run.
+    items = CartItem.objects.filter(product__deleted_at__isnull=True, cart_id__lt=shape[0], product_id__lt=shape[1])
+    if cart_ids is not None:
+        items = items.filter(cart_id__in=cart_ids.tolist())
+    pairs = np.fromiter(
+        itertools.chain.from_iterable(items.values_list('cart_id', 'product_id').iterator(chunk_size=10000)),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    ones = np.ones(len(pairs), dtype=np.int32)
+    return sparse.csr_matrix((ones, (pairs[:, 0], pairs[:, 1])), shape=shape)
+
+
+def co_occurrence(membership):
+    counts = (membership.T @ membership).tocsr()
+    counts = (counts - sparse.diags(counts.diagonal(), dtype=counts.dtype)).tocsr()
+    counts.eliminate_zeros()
+    return counts
+
+
+def top_neighbours(counts, product_ids, k):
+    # Returns {product_id: [[neighbour_id, carts in common], ...]} with the k
+    # largest counts per row, ties broken by the lower product id.
+    rows = counts[product_ids].tocoo()
+    order = np.lexsort((rows.col, -rows.data, rows.row))
+    row, col, data = rows.row[order], rows.col[order], rows.data[order]
+    starts = np.concatenate(([0], np.cumsum(np.bincount(row, minlength=len(product_ids)))[:-1]))
+    keep = np.arange(len(row)) - starts[row] < k
+    row, col, data = row[keep], col[keep], data[keep]
+    bounds = np.cumsum(np.bincount(row, minlength=len(product_ids)))[:-1]
+    return {
+        int(product_id): np.column_stack((cols, values)).astype(np.int64).tolist()
+        for product_id, cols, values in zip(product_ids, np.split(col, bounds), np.split(data, bounds))
+    }
+
+
+def write_neighbours(neighbours, full=False):
+    existing = set(Product.all_objects.filter(id__in=list(neighbours)).values_list('id', flat=True))
+    rows = [
+        ProductRecommendation(product_id=product_id, neighbours=items)
+        for product_id, items in neighbours.items() if items and product_id in existing
+    ]
+    with transaction.atomic():
+        stale = ProductRecommendation.objects.all()
+        if not full:
+            stale = stale.filter(product_id__in=list(neighbours))
+        stale.exclude(product_id__in=[row.product_id for row in rows]).delete()
+        ProductRecommendation.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True,
+            unique_fields=['product'], update_fields=['neighbours', 'updated_at'],
+        )
+    return len(rows)
+
+
+def refresh(full=False):
+    # Folds the carts changed since the last run into the co-occurrence
+    # counts and rewrites the top-K rows of every product they touched.
+    # Falls back to a full rebuild without a saved state. The next run starts
+    # RECOMMENDATIONS_LAG seconds before this one, so carts stamped before now
+    # but committed after the reads are folded in then; folding a cart in
+    # twice gives the same counts.
+    started = time.perf_counter()
+    now = timezone.now()
+    shape = matrix_shape()
+    state = None if full else load_state()
+    if state is None:
+        membership = load_membership(shape)
+        counts = co_occurrence(membership)
+        products = np.unique(counts.nonzero()[0])
+        changed = int(np.count_nonzero(membership.getnnz(axis=1)))
+    else:
+        membership, counts, since = state
+        shape = (max(shape[0], membership.shape[0]), max(shape[1], membership.shape[1]))
+        membership.resize(shape)
+        counts.resize((shape[1], shape[1]))
+        carts = Cart.objects.filter(id__lt=shape[0])
+        updated = np.fromiter(carts.filter(updated_at__gte=since).values_list('id', flat=True), dtype=np.int64)
+        known = np.fromiter(carts.values_list('id', flat=True), dtype=np.int64)
+        vanished = np.setdiff1d(np.unique(membership.nonzero()[0]), known)
+        # Soft deletes and purges leave Cart.updated_at alone: reload the carts
+        # that still hold a product which is no longer live.
+        live = np.fromiter(Product.objects.values_list('id', flat=True), dtype=np.int64)
+        hidden = np.setdiff1d(np.unique(membership.nonzero()[1]), live)
+        holding = np.unique(membership[:, hidden].nonzero()[0]) if len(hidden) else np.array([], dtype=np.int64)
+        reload = np.union1d(updated, holding)
+        changed_ids = np.union1d(reload, vanished)
+        mask = np.zeros(shape[0], dtype=np.int32)
+        mask[changed_ids] = 1
+        before = sparse.diags(mask, dtype=np.int32) @ membership
+        after = load_membership(shape, reload)
+        counts = counts - co_occurrence(before) + co_occurrence(after)
+        counts.eliminate_zeros()
+        membership = (sparse.diags(1 - mask, dtype=np.int32) @ membership + after).tocsr()
+        products = np.union1d(before.nonzero()[1], after.nonzero()[1])
+        changed = len(changed_ids)
+
+    written = write_neighbours(top_neighbours(counts, products, settings.RECOMMENDATIONS_TOP_K), full=state is None)
+    save_state(membership, counts, now - datetime.timedelta(seconds=settings.RECOMMENDATIONS_LAG))
+    logger.info(
+        'Refreshed recommendations from %d carts (%d products, %d rows) in %.2fs',
+        changed, len(products), written, time.perf_counter() - started,
+    )
+    return {'carts': changed, 'products': len(products), 'rows': written, 'full': state is None}
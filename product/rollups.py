@@ -0,0 +1,103 @@
+import datetime
+import threading
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+
+from .models import Comment, CommentRollup, Product
+
+
+_local = threading.local()
+
+
+@contextmanager
+def bumps_suspended():
+    # For bulk comment deletes that fix up the rollups themselves (the purge).
+    _local.suspended = True
+    try:
+        yield
+    finally:
+        _local.suspended = False
+
+
+def bump(day, product_id, delta, vendor_id=None):
+    # One upsert per comment write; concurrent writers add up instead of
+    # overwriting each other.
+    if getattr(_local, 'suspended', False):
+        return
+    if vendor_id is None:
+        vendor_id = Product.all_objects.filter(pk=product_id).values_list('vendor_id', flat=True).first()
+        if vendor_id is None:
+            return
+    table = connection.ops.quote_name(CommentRollup._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (day, product_id, vendor_id, comments) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT (day, product_id) DO UPDATE SET comments = {table}.comments + EXCLUDED.comments',
+            [day, product_id, vendor_id, delta],
+        )
+
+
+def rollup(start, end):
+    # Recounts the buckets of days start..end (inclusive) from the comments.
+    # SHARE ROW EXCLUSIVE lets reads through but holds off every bump() until
+    # the new counts are in; comment writes bump inside their own transaction,
+    # so a comment is either in the recount or bumped after it, never both.
+    table = connection.ops.quote_name(CommentRollup._meta.db_table)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+        counts = Comment.objects.filter(created_date__range=(start, end)).values(
+            'created_date', 'product_id', 'product__vendor_id',
+        ).annotate(comments=Count('id')).order_by()
+        rows = [
+            CommentRollup(
+                day=row['created_date'], product_id=row['product_id'],
+                vendor_id=row['product__vendor_id'], comments=row['comments'],
+            )
+            for row in counts
+        ]
+        CommentRollup.objects.filter(day__range=(start, end)).delete()
+        CommentRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def backfill(days=31, progress=None):
+    # Re-rolls the whole comment history, `days` at a time so no single
+    # transaction holds the table for long.
+    bounds = Comment.objects.aggregate(first=Min('created_date'), last=Max('created_date'))
+    if bounds['first'] is None:
+        return 0
+    total = 0
+    start = bounds['first']
+    while start <= bounds['last']:
+        end = min(start + datetime.timedelta(days=days - 1), bounds['last'])
+        total += rollup(start, end)
+        if progress:
+            progress(start, end, total)
+        start = end + datetime.timedelta(days=1)
+    return total
+
+
+def comment_activity(start, end, product_id=None, vendor_id=None, top=10):
+    rollups = CommentRollup.objects.filter(day__range=(start, end))
+    if product_id is not None:
+        rollups = rollups.filter(product_id=product_id)
+    if vendor_id is not None:
+        rollups = rollups.filter(vendor_id=vendor_id)
+    per_day = dict(rollups.values_list('day').annotate(total=Sum('comments')).order_by())
+    days = [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+    data = {
+        'start': start,
+        'end': end,
+        'total': sum(per_day.values()),
+        'days': [{'day': day, 'comments': per_day.get(day, 0)} for day in days],
+    }
+    if product_id is None:
+        data['top_products'] = [
+            {'product': row['product_id'], 'comments': row['total']}
+            for row in rollups.values('product_id').annotate(total=Sum('comments')).filter(total__gt=0)
+            .order_by('-total', 'product_id')[:top]
+        ]
+    return data
@@ -1,13 +1,21 @@
 from rest_framework import serializers
 
-from .models import Product, Cart, Comment
+from .cache import get_category_name
+from .models import Product, Cart, CartItem, Comment
 
 
 class ProductSerializer(serializers.ModelSerializer):
+    category_name = serializers.SerializerMethodField()
+
+    def get_category_name(self, obj):
+        categories = self.context.get('categories')
+        if categories is not None:
+            return categories.get(obj.category_id)
+        return get_category_name(obj.category_id)
 
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ['deleted_at']
 
 class CategorySerializer(serializers.ModelSerializer):
 
@@ -16,12 +24,43 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["name"]
 
 class CartSerializer(serializers.ModelSerializer):
+    product = serializers.PrimaryKeyRelatedField(many=True, queryset=Product.objects.all())
 
     class Meta:
         model = Cart
         fields = "__all__"
 
 
+class CartItemSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = CartItem
+        fields = ['product', 'quantity']
+
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'remove', 'set'])
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'set' and 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': 'This field is required for set.'})
+        return attrs
+
+
+class CartOperationsSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        product_ids = {operation['product'] for operation in operations}
+        existing = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+        missing = sorted(product_ids - existing)
+        if missing:
+            raise serializers.ValidationError(f'Unknown products: {missing}')
+        return operations
+
+
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
@@ -0,0 +1,163 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from user.cache import refresh_vendor
+from .autocomplete import index_product, refresh_popularity, unindex_product
+from .cache import invalidate_cart_summaries, invalidate_cart_summary, invalidate_categories, invalidate_product_detail
+from .changes import record_change
+from .facets import invalidate_facets
+from .models import Cart, CartItem, Category, Product, ProductChange, Comment
+from .payments import request_sync
+from .rollups import bump
+from .snapshots import mark_dirty
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_categories)
+    transaction.on_commit(lambda: mark_dirty(instance.id))
+
+
+@receiver(pre_save, sender=Product)
+def product_saving(sender, instance, **kwargs):
+    if instance.pk is not None:
+        saved = Product.all_objects.filter(pk=instance.pk).values(
+            'vendor_id', 'category_id', 'name', 'price', 'deleted_at',
+        ).first() or {}
+        instance._saved_vendor_id = saved.get('vendor_id')
+        instance._saved_category_id = saved.get('category_id')
+        instance._saved_name = saved.get('name')
+        instance._saved_price = saved.get('price')
+        instance._saved_deleted_at = saved.get('deleted_at')
+
+
+def _cart_fields_changed(product):
+    # Cart summaries show the name, price and vendor of live products only.
+    if getattr(product, '_saved_vendor_id', None) is None:
+        return False
+    saved = (product._saved_name, product._saved_price, product._saved_vendor_id, product._saved_deleted_at is None)
+    return saved != (product.name, product.price, product.vendor_id, product.deleted_at is None)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    if kwargs['signal'] is post_delete and instance.deleted_at is not None:
+        # Purged after a soft delete, which already refreshed everything.
+        return
+    transaction.on_commit(invalidate_facets)
+    transaction.on_commit(lambda: invalidate_product_detail(instance.id))
+    transaction.on_commit(lambda: refresh_vendor(instance.vendor_id))
+    transaction.on_commit(lambda: mark_dirty(instance.category_id))
+    if kwargs['signal'] is post_delete or _cart_fields_changed(instance):
+        transaction.on_commit(lambda: invalidate_cart_summaries([instance.id]))
+    previous = getattr(instance, '_saved_vendor_id', None)
+    if previous is not None and previous != instance.vendor_id:
+        transaction.on_commit(lambda: refresh_vendor(previous))
+    previous_category = getattr(instance, '_saved_category_id', None)
+    if previous_category is not None and previous_category != instance.category_id:
+        transaction.on_commit(lambda: mark_dirty(previous_category))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_autocomplete(sender, instance, **kwargs):
+    previous_name = getattr(instance, '_saved_name', None)
+    if kwargs['signal'] is post_save and instance.deleted_at is None:
+        transaction.on_commit(lambda: index_product(instance.id, instance.name, previous_name))
+    elif kwargs['signal'] is post_save or instance.deleted_at is None:
+        transaction.on_commit(lambda: unindex_product(instance.id, previous_name or instance.name))
+
+
+@receiver(post_save, sender=Product)
+def product_stripe_sync(sender, instance, created, **kwargs):
+    if instance.deleted_at is not None:
+        return
+    if created or (getattr(instance, '_saved_name', None), getattr(instance, '_saved_price', None)) != (instance.name, instance.price):
+        transaction.on_commit(request_sync)
+
+
+@receiver(post_save, sender=Product)
+def log_product_saved(sender, instance, created, **kwargs):
+    if created:
+        record_change(instance, ProductChange.CREATE)
+    elif instance.deleted_at is not None:
+        record_change(instance, ProductChange.DELETE)
+    else:
+        record_change(instance, ProductChange.UPDATE)
+
+
+@receiver(post_delete, sender=Product)
+def log_product_deleted(sender, instance, **kwargs):
+    if instance.deleted_at is None:
+        record_change(instance, ProductChange.DELETE)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_product_detail(instance.product_id))
+
+
+def _comment_vendor(comment):
+    return comment.product.vendor_id if Comment.product.is_cached(comment) else None
+
+
+@receiver(pre_save, sender=Comment)
+def comment_saving(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._saved_bucket = Comment.objects.filter(pk=instance.pk).values_list('created_date', 'product_id').first()
+
+
+@receiver(post_save, sender=Comment)
+def rollup_comment_saved(sender, instance, created, **kwargs):
+    bucket = (instance.created_date, instance.product_id)
+    previous = getattr(instance, '_saved_bucket', None)
+    if created:
+        bump(*bucket, 1, _comment_vendor(instance))
+    elif previous is not None and previous != bucket:
+        bump(*previous, -1)
+        bump(*bucket, 1, _comment_vendor(instance))
+
+
+@receiver(post_delete, sender=Comment)
+def rollup_comment_deleted(sender, instance, **kwargs):
+    bump(instance.created_date, instance.product_id, -1, _comment_vendor(instance))
+
+
+def touch_carts(cart_ids):
+    # Cart.updated_at drives the incremental recommendations refresh.
+    Cart.objects.filter(pk__in=cart_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def cart_item_changed(sender, instance, **kwargs):
+    touch_carts([instance.cart_id])
+    transaction.on_commit(lambda: invalidate_cart_summary(instance.cart_id))
+    # Popularity counts the carts holding a product, which a quantity change
+    # (a save with created=False) does not alter.
+    if kwargs.get('created', True):
+        transaction.on_commit(lambda: refresh_popularity(instance.product_id))
+
+
+@receiver(m2m_changed, sender=CartItem)
+def cart_products_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Cart.product.add()/set()/remove()/clear() bypass the CartItem signals.
+    if action == 'pre_clear':
+        # post_clear has no pk_set; remember what is about to go.
+        items = CartItem.objects.filter(**{'product' if reverse else 'cart': instance})
+        instance._cleared_pks = list(items.values_list('cart_id' if reverse else 'product_id', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_pks', [])
+    cart_ids = list(pk_set or []) if reverse else [instance.pk]
+    product_ids = [instance.pk] if reverse else list(pk_set or [])
+    touch_carts(cart_ids)
+    transaction.on_commit(lambda: [invalidate_cart_summary(cart_id) for cart_id in cart_ids])
+    transaction.on_commit(lambda: [refresh_popularity(product_id) for product_id in product_ids])
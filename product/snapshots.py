@@ -0,0 +1,147 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from core.cache import _redis
+from .cache import get_categories
+from .models import Product
+from .serializers import ProductSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = 'catalog:dirty'
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+
+def snapshot_dir():
+    return Path(settings.CATALOG_SNAPSHOT_DIR)
+
+
+def shard_path(category_id, page, suffix=''):
+    return snapshot_dir() / str(category_id) / f'{page}.json{suffix}'
+
+
+def read_manifest():
+    try:
+        with open(snapshot_dir() / 'manifest.json') as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return None
+
+
+def mark_dirty(*category_ids):
+    connection = _redis()
+    if connection is not None and category_ids:
+        connection.sadd(DIRTY_KEY, *category_ids)
+
+
+def take_dirty():
+    connection = _redis()
+    if connection is None:
+        return None
+    pipeline = connection.pipeline(transaction=True)
+    pipeline.smembers(DIRTY_KEY)
+    pipeline.delete(DIRTY_KEY)
+    members, _ = pipeline.execute()
+    return {int(member) for member in members}
+
+
+def _write(path, data):
+    # Readers only ever see complete files: write next to the target, then rename.
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as shard:
+        shard.write(data)
+    os.replace(tmp, path)
+
+
+def write_shard(category_id, page, payload):
+    data = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    path = shard_path(category_id, page)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write(path.with_name(path.name + '.gz'), gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(path.with_name(path.name + '.br'), brotli.compress(data, quality=11))
+    _write(path, data)
+    return len(data)
+
+
+def build_category(category_id, categories):
+    page_size = settings.CATALOG_SNAPSHOT_PAGE_SIZE
+    products = list(Product.objects.filter(category_id=category_id).order_by('id'))
+    pages = max(1, -(-len(products) // page_size))
+    size = 0
+    for page in range(pages):
+        chunk = products[page * page_size:(page + 1) * page_size]
+        size += write_shard(category_id, page + 1, {
+            'category': category_id,
+            'page': page + 1,
+            'pages': pages,
+            'count': len(products),
+            'results': ProductSerializer(chunk, many=True, context={'categories': categories}).data,
+        })
+    for stale in shard_path(category_id, 0).parent.glob('*.json*'):
+        number = stale.name.split('.', 1)[0]
+        if number.isdigit() and int(number) > pages:
+            stale.unlink(missing_ok=True)
+    return {'count': len(products), 'pages': pages, 'bytes': size}
+
+
+def build_snapshot(full=False):
+    # Re-renders the categories whose products changed since the last build
+    # (or everything on the first run / with full=True) and swaps in a new
+    # manifest. Returns the rebuilt category ids.
+    started = time.perf_counter()
+    manifest = None if full else read_manifest()
+    dirty = take_dirty()
+    categories = get_categories()
+    if manifest is None or dirty is None:
+        manifest = {'categories': {}}
+        rebuild = set(categories)
+        if snapshot_dir().exists():
+            rebuild |= {int(child.name) for child in snapshot_dir().iterdir() if child.is_dir() and child.name.isdigit()}
+    else:
+        rebuild = dirty
+
+    try:
+        for category_id in sorted(rebuild):
+            if category_id in categories:
+                manifest['categories'][str(category_id)] = build_category(category_id, categories)
+            else:
+                manifest['categories'].pop(str(category_id), None)
+                shutil.rmtree(snapshot_dir() / str(category_id), ignore_errors=True)
+    except Exception:
+        mark_dirty(*rebuild)
+        raise
+
+    manifest['generated_at'] = timezone.now().isoformat()
+    manifest['page_size'] = settings.CATALOG_SNAPSHOT_PAGE_SIZE
+    manifest['encodings'] = ['br', 'gzip'] if brotli is not None else ['gzip']
+    snapshot_dir().mkdir(parents=True, exist_ok=True)
+    _write(snapshot_dir() / 'manifest.json', json.dumps(manifest, indent=2).encode())
+    logger.info('Rebuilt %d catalog categories in %.2fs', len(rebuild), time.perf_counter() - started)
+    return sorted(rebuild)
+
+
+def find_variant(path, accept_encoding):
+    # Returns (path, content encoding or None) of the best precompressed
+    # variant the client accepts, or (None, None) if the file does not exist.
+    accepted = {part.split(';', 1)[0].strip() for part in accept_encoding.split(',')}
+    for encoding, suffix in ENCODINGS.items():
+        if encoding in accepted:
+            variant = path.with_name(path.name + suffix)
+            if variant.exists():
+                return variant, encoding
+    return (path, None) if path.exists() else (None, None)
@@ -1,3 +1,278 @@
-from django.test import TestCase
+import datetime
+import threading
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import stripe
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from core.models import Job
+from user.models import Customer, Vendor
+from . import cache as product_cache
+from .cache import PRODUCT_DASHBOARD_KEY, get_cart_summary, invalidate_cart_summary
+from .fake_stripe import FakeStripe
+from .filters import ProductFilter
+from .jobs import sync_stripe_products
+from .models import Cart, CartItem, Category, Comment, Product, StripeProduct
+from .payments import sync_products
+from .views import CreateCheckoutSessionCart, DashboardProduct, ProductDetailAPIView
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN output is PostgreSQL specific')
+class ProductFilterIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        vendors = [
+            Vendor.objects.create(email=f'vendor{i}@example.com', name='v', second_name='v', phone_number='1', description='d')
+            for i in range(5)
+        ]
+        categories = cls.categories = [Category.objects.create(name=f'category {i}') for i in range(20)]
+        Product.objects.bulk_create([
+            Product(
+                vendor=vendors[i % len(vendors)],
+                category=categories[i % len(categories)],
+                name=f'product {i:05d}',
+                description='',
+                price=i % 10000,
+            )
+            for i in range(20000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE product_product')
+
+    def explain(self, params):
+        return ProductFilter(params, queryset=Product.objects.all()).qs.explain()
+
+    def test_category_price_range_uses_composite_index(self):
+        category_ids = ','.join(str(category.id) for category in self.categories[:2])
+        plan = self.explain({'category__in': category_ids, 'price__gte': '100', 'price__lte': '200'})
+        self.assertIn('product_category_price_idx', plan)
+
+    def test_vendor_price_range_uses_composite_index(self):
+        vendor_id = Vendor.objects.values_list('id', flat=True).first()
+        plan = self.explain({'vendor__in': str(vendor_id), 'price__lte': '50'})
+        self.assertIn('product_vendor_price_idx', plan)
+
+    def test_name_prefix_uses_pattern_index(self):
+        plan = self.explain({'name__startswith': 'product 0001'})
+        self.assertIn('product_name_prefix_idx', plan)
+
+    def test_range_filters(self):
+        queryset = ProductFilter({'price__gte': '10', 'price__lte': '19'}, queryset=Product.objects.all()).qs
+        prices = list(queryset.values_list('price', flat=True))
+        self.assertEqual(len(prices), 20)
+        self.assertTrue(all(10 <= price <= 19 for price in prices))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DashboardStampedeTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def request_concurrently(self, count):
+        barrier = threading.Barrier(count)
+        responses = []
+
+        def request():
+            barrier.wait()
+            responses.append(DashboardProduct.as_view()(APIRequestFactory().get('/')))
+
+        threads = [threading.Thread(target=request) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def slow_dashboard(self, calls):
+        def build():
+            calls.append(1)
+            time.sleep(0.3)
+            return {'product_count': len(calls)}
+        return build
+
+    def test_concurrent_misses_recompute_once(self):
+        calls = []
+        with mock.patch('product.views.build_product_dashboard', self.slow_dashboard(calls)):
+            responses = self.request_concurrently(20)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({response.data['product_count'] for response in responses}, {1})
+
+    def test_stale_entry_is_served_while_one_request_refreshes(self):
+        cache.set(PRODUCT_DASHBOARD_KEY, {'value': {'product_count': 0}, 'expires': time.time() - 1, 'delta': 0.0}, 60)
+        calls = []
+        with mock.patch('product.views.build_product_dashboard', self.slow_dashboard(calls)):
+            responses = self.request_concurrently(20)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(response.data['product_count'] for response in responses), [0] * 19 + [1])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class StripeCatalogSyncTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake = FakeStripe().start()
+        cls.addClassCleanup(cls.fake.stop)
+
+    def setUp(self):
+        cache.clear()
+        self.fake.reset_calls()
+        patcher = mock.patch.object(stripe, 'api_base', self.fake.url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        vendor = Vendor.objects.create(email='vendor@example.com', name='v', second_name='v', phone_number='1', description='d')
+        category = Category.objects.create(name='category')
+        self.products = [
+            Product.objects.create(vendor=vendor, category=category, name=f'product {i}', description='', price=100 * (i + 1))
+            for i in range(3)
+        ]
+        customer = Customer.objects.create(
+            email='customer@example.com', name='c', second_name='c', phone_number='1', card_number='1', address='a', post_code='1',
+        )
+        self.cart = Cart.objects.create(customer=customer)
+        for quantity, product in enumerate(self.products, 1):
+            CartItem.objects.create(cart=self.cart, product=product, quantity=quantity)
+
+    def checkout_cart(self):
+        request = APIRequestFactory().post('/')
+        return CreateCheckoutSessionCart.as_view()(request, id=self.cart.customer_id)
+
+    def test_sync_creates_each_product_once(self):
+        self.assertEqual(sync_products(), {'synced': 3, 'failed': 0})
+        self.assertEqual(self.fake.calls, {'POST /v1/products': 3})
+        self.assertEqual(StripeProduct.objects.count(), 3)
+
+        self.fake.reset_calls()
+        self.assertEqual(sync_products(), {'synced': 0, 'failed': 0})
+        self.assertEqual(sum(self.fake.calls.values()), 0)
+
+    def test_price_change_creates_new_default_price(self):
+        sync_products()
+        product = self.products[0]
+        old_price = StripeProduct.objects.get(product=product).stripe_price_id
+        product.price = 250
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertTrue(Job.objects.filter(name=sync_stripe_products.job_name, status=Job.QUEUED).exists())
+
+        self.fake.reset_calls()
+        self.assertEqual(sync_products(), {'synced': 1, 'failed': 0})
+        self.assertEqual(self.fake.calls, {'POST /v1/prices': 1, 'POST /v1/products/{id}': 1})
+        mapping = StripeProduct.objects.get(product=product)
+        self.assertNotEqual(mapping.stripe_price_id, old_price)
+        self.assertEqual(self.fake.objects[mapping.stripe_product_id]['default_price'], mapping.stripe_price_id)
+        self.assertEqual(self.fake.objects[mapping.stripe_price_id]['unit_amount'], 250)
+
+    def test_idempotency_keys_are_not_reused_after_a_reset(self):
+        sync_products()
+        product = self.products[0]
+        # A reset database maps the same product id to a different product.
+        StripeProduct.objects.all().delete()
+        Product.objects.filter(pk=product.pk).update(name='renamed')
+        self.fake.reset_calls()
+        self.assertEqual(sync_products(), {'synced': 3, 'failed': 0})
+        mapping = StripeProduct.objects.get(product=product)
+        self.assertEqual(self.fake.objects[mapping.stripe_product_id]['name'], 'renamed')
+
+    def test_cart_checkout_references_synced_prices(self):
+        sync_products()
+        self.fake.reset_calls()
+        response = self.checkout_cart()
+        self.assertEqual(response.status_code, 303)
+        self.assertEqual(self.fake.calls, {'POST /v1/checkout/sessions': 1})
+        _, _, params = self.fake.requests[0]
+        prices = {mapping.stripe_price_id for mapping in StripeProduct.objects.all()}
+        self.assertEqual({params[f'line_items[{i}][price]'] for i in range(3)}, prices)
+        self.assertFalse(any('product_data' in name for name in params))
+
+    def test_unsynced_product_falls_back_to_inline_price(self):
+        sync_products(batch_size=1)
+        StripeProduct.objects.filter(product=self.products[2]).delete()
+        cache.clear()
+        self.fake.reset_calls()
+        response = self.checkout_cart()
+        self.assertEqual(response.status_code, 303)
+        self.assertEqual(self.fake.calls, {'POST /v1/checkout/sessions': 1})
+        _, _, params = self.fake.requests[0]
+        inline = [name for name in params if name.endswith('[product_data][name]')]
+        self.assertEqual([params[name] for name in inline], ['product 2'])
+        self.assertTrue(Job.objects.filter(name=sync_stripe_products.job_name, status=Job.QUEUED).exists())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CartSummaryCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        vendor = Vendor.objects.create(email='vendor@example.com', name='v', second_name='v', phone_number='1', description='d')
+        category = Category.objects.create(name='category')
+        self.product = Product.objects.create(vendor=vendor, category=category, name='product', description='', price=100)
+        customer = Customer.objects.create(
+            email='customer@example.com', name='c', second_name='c', phone_number='1', card_number='1', address='a', post_code='1',
+        )
+        self.cart = Cart.objects.create(customer=customer)
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+
+    def test_build_racing_an_invalidation_is_not_served(self):
+        build = product_cache.build_cart_summary
+
+        def racing(cart_id):
+            summary = build(cart_id)
+            CartItem.objects.filter(cart=self.cart).update(quantity=5)
+            invalidate_cart_summary(cart_id)
+            return summary
+
+        with mock.patch.object(product_cache, 'build_cart_summary', side_effect=racing):
+            self.assertEqual(get_cart_summary(self.cart.id)['item_count'], 1)
+        self.assertEqual(get_cart_summary(self.cart.id)['item_count'], 5)
+
+    def test_reverse_clear_invalidates_carts(self):
+        self.assertEqual(get_cart_summary(self.cart.id)['item_count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.cart_set.clear()
+        self.assertEqual(get_cart_summary(self.cart.id)['item_count'], 0)
+
+    def test_description_edit_keeps_summaries(self):
+        get_cart_summary(self.cart.id)
+        with mock.patch.object(product_cache, 'build_cart_summary') as build:
+            self.product.description = 'edited'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.save()
+            get_cart_summary(self.cart.id)
+        build.assert_not_called()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, COMMENT_RECENT_MONTHS=12)
+class ProductDetailCommentHistoryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        vendor = Vendor.objects.create(email='vendor@example.com', name='v', second_name='v', phone_number='1', description='d')
+        category = Category.objects.create(name='category')
+        self.product = Product.objects.create(vendor=vendor, category=category, name='product', description='', price=100)
+        today = datetime.date.today()
+        Comment.objects.create(product=self.product, author='recent', text='t', created_date=today)
+        Comment.objects.create(product=self.product, author='old', text='t', created_date=today - datetime.timedelta(days=800))
+
+    def detail(self, **params):
+        request = APIRequestFactory().get('/', params)
+        return ProductDetailAPIView.as_view()(request, id=self.product.id)
+
+    def test_recent_comments_by_default(self):
+        response = self.detail()
+        self.assertEqual([comment['author'] for comment in response.data['comments']], ['recent'])
+        self.assertIsNotNone(response.data['comments_since'])
+
+    def test_history_opt_in_is_cached_separately(self):
+        self.detail()
+        response = self.detail(history='1')
+        self.assertEqual(sorted(comment['author'] for comment in response.data['comments']), ['old', 'recent'])
+        self.assertIsNone(response.data['comments_since'])
+        self.assertEqual(len(self.detail().data['comments']), 1)
@@ -1,36 +1,47 @@
+from django.conf import settings
 from django.urls import path
-from .views import (
-    ProductList,
-    ProductCreateAPIView,
-    ProductDetailAPIView,
-    ProductUpdateAPIView,
-    ProductDeleteAPIView,
-    CartDetailAPIView,
-    AddToCartAPIView,
-    DashboardProduct,
-    CreateCheckoutSession,
-    CreateCheckoutSessionCart,
-    CategoryCreateAPIView,
-    ProductCommentView
-)
+
+from core.lazy import lazy_view
+
+
+def view(name):
+    return lazy_view(f'product.views.{name}')
+
+
+def read_view(name):
+    if settings.ASYNC_READ_VIEWS:
+        return lazy_view(f'product.async_views.{name}', asynchronous=True)
+    return view(name)
+
+
+# A plain Django view, so CSRF protection stays on.
+catalog_view = lazy_view('product.views.CatalogSnapshotView', csrf_exempt=False)
 
 urlpatterns = [
-    path('list/', ProductList.as_view(), name='product-list'),
-    path('create/', ProductCreateAPIView.as_view(), name='product-create'),
-    path('<int:id>/', ProductDetailAPIView.as_view(), name='product-detail'),
-    path('<int:id>/update/', ProductUpdateAPIView.as_view(), name='product-update'),
-    path('<int:id>/delete/', ProductDeleteAPIView.as_view(), name='product-delete'),
+    path('list/', read_view('ProductList'), name='product-list'),
+    path('create/', view('ProductCreateAPIView'), name='product-create'),
+    path('<int:id>/', read_view('ProductDetailAPIView'), name='product-detail'),
+    path('<int:id>/update/', view('ProductUpdateAPIView'), name='product-update'),
+    path('<int:id>/delete/', view('ProductDeleteAPIView'), name='product-delete'),
+    path('<int:id>/recommendations/', view('ProductRecommendationsAPIView'), name='product-recommendations'),
+
+    path('create-category/', view('CategoryCreateAPIView'), name='category-create'),
+
+    path('cart/<int:user_id>/', read_view('CartDetailAPIView'), name='cart'),
+    path('cart/<int:user_id>/add/', view('AddToCartAPIView'), name='add-cart'),
 
-    path('create-category/', CategoryCreateAPIView.as_view(), name='category-create'),
+    path('avp/', view('DashboardProduct'), name='average-price'),
 
-    path('cart/<int:user_id>/', CartDetailAPIView.as_view(), name='cart'),
-    path('cart/<int:user_id>/add/', AddToCartAPIView.as_view(), name='add-cart'),
+    path('buy-product/<int:id>/<int:customer_id>/', view('CreateCheckoutSession')),
+    path('buy-product-cart/<int:id>/', view('CreateCheckoutSessionCart')),
 
-    path('avp/', DashboardProduct.as_view(), name='average-price'),
+    path('products/<int:product_id>/comments/', view('ProductCommentView')),
+    path('analytics/comments/', view('CommentActivityAPIView'), name='comment-activity'),
 
-    path('buy-product/<int:id>/<int:customer_id>/', CreateCheckoutSession.as_view()),
-    path('buy-product-cart/<int:id>/', CreateCheckoutSessionCart.as_view()),
+    path('changes/', view('ProductChangesAPIView'), name='product-changes'),
+    path('suggest/', view('ProductSuggestAPIView'), name='product-suggest'),
 
-    path('products/<int:product_id>/comments/', ProductCommentView.as_view()),
+    path('catalog/', catalog_view, name='catalog-manifest'),
+    path('catalog/<int:category_id>/<int:page>/', catalog_view, name='catalog-shard'),
 
 ]
@@ -1,19 +1,34 @@
-import stripe
+import datetime
+
 from django.conf import settings
-from django.db.models import Avg, Sum, Count
-from django.http import Http404
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils import timezone
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework import permissions, status, generics, filters
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
 from user.models import Customer
-from .models import Product, Category, Cart, Comment
-from .serializers import ProductSerializer, CartSerializer, CategorySerializer, CommentSerializer
+from core.cache import record_access, get_or_compute
+from core.throttling import TokenBucketThrottle
+from .cache import product_detail_key, build_product_detail, PRODUCT_DASHBOARD_KEY, build_product_dashboard, \
+    get_cart_summary, get_categories
+from .facets import get_product_facets
+from .filters import ProductFilter
+from .jobs import warm_product_cache, purge_deleted_rows
+from .models import Product, Category, Cart, CartItem, ProductRecommendation
+from .payments import checkout_line_items, stripe_client
+from .autocomplete import suggest
+from .changes import START, changes_since, horizon, parse_cursor
+from .rollups import comment_activity
+from .snapshots import find_variant, shard_path, snapshot_dir
+from .serializers import ProductSerializer, CartSerializer, CartItemSerializer, CartOperationsSerializer, \
+    CategorySerializer, CommentSerializer
 from user.permissions import IsVendorPermission, IsOwnerOrReadOnly
 from user.serializers import CustomerRegisterSerializer
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 webhook_secret = settings.STRIPE_WEBHOOK_SECRET
 
 FRONTEND_CHECKOUT_SUCCESS_URL = settings.CHECKOUT_SUCCESS_URL
@@ -24,11 +39,18 @@ class ProductList(generics.ListAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'price']
+    filterset_class = ProductFilter
     search_fields = ['name', 'category__id']
     ordering_fields = '__all__'
     templates = 'index.html'
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets') == '1' and isinstance(response.data, dict):
+            queryset = self.filter_queryset(self.get_queryset())
+            response.data['facets'] = get_product_facets(queryset, request.query_params)
+        return response
+
     def get_context_data(self, **kwargs):
         context = super(ProductList, self).get_context_data(**kwargs)
         context.update({
@@ -42,14 +64,15 @@ class ProductCreateAPIView(APIView):
     def post(self, request):
         serializer = ProductSerializer(data=request.data)
         if serializer.is_valid():
-            product = Product.objects.create(
-                vendor_id=request.data['vendor'],
-                category_id=request.data['category'],
-                name=request.data['name'],
-                description=request.data['description'],
-                price=request.data['price']
-            )
-            product.save()
+            with transaction.atomic():
+                product = Product.objects.create(
+                    vendor_id=request.data['vendor'],
+                    category_id=request.data['category'],
+                    name=request.data['name'],
+                    description=request.data['description'],
+                    price=request.data['price']
+                )
+            warm_product_cache.delay(product.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -64,12 +87,14 @@ class ProductDetailAPIView(APIView):
             raise Http404
 
     def get(self, request, id):
-        product = self.get_object(id)
-        serializer = ProductSerializer(product)
-        comments = Comment.objects.filter(product=product)
-        serializer2 = CommentSerializer(comments, many=True)
-        data = serializer.data
-        data['comments'] = serializer2.data
+        record_access('product', id)
+        # Comments older than COMMENT_RECENT_MONTHS only with ?history=1.
+        history = request.query_params.get('history') == '1'
+        data = get_or_compute(
+            product_detail_key(id, history),
+            lambda: build_product_detail(self.get_object(id), history),
+            settings.PRODUCT_DETAIL_CACHE_TIMEOUT,
+        )
         return Response(data, status=status.HTTP_200_OK)
 
 
@@ -86,7 +111,8 @@ class ProductUpdateAPIView(APIView):
         snippet = self.get_object(id)
         serializer = ProductSerializer(snippet, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -102,7 +128,9 @@ class ProductDeleteAPIView(APIView):
 
     def delete(self, request, id):
         snippet = self.get_object(id)
-        snippet.delete()
+        with transaction.atomic():
+            snippet.soft_delete()
+        purge_deleted_rows.delay()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -112,17 +140,20 @@ class CartDetailAPIView(APIView):
     def get_object(self, user_id):
         try:
             return Cart.objects.get(customer_id=user_id)
-        except Product.DoesNotExist:
+        except Cart.DoesNotExist:
             raise Http404
 
     def get(self, request, user_id):
         cart = self.get_object(user_id)
         serializer = CartSerializer(cart)
         prod_serializer = ProductSerializer(cart.product.all(), many=True)
+        item_serializer = CartItemSerializer(CartItem.objects.filter(cart=cart, product__deleted_at__isnull=True), many=True)
         user_serializer = CustomerRegisterSerializer(cart.customer)
         data = serializer.data
         data['customer'] = user_serializer.data
         data['product'] = prod_serializer.data
+        data['items'] = item_serializer.data
+        data['summary'] = get_cart_summary(cart.id)
         return Response(data, status=status.HTTP_200_OK)
 
 
@@ -132,7 +163,7 @@ class AddToCartAPIView(APIView):
     def get_object(self, user_id):
         try:
             return Cart.objects.get(customer_id=user_id)
-        except Product.DoesNotExist:
+        except Cart.DoesNotExist:
             raise Http404
 
     def put(self, request, user_id):
@@ -143,6 +174,16 @@ class AddToCartAPIView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def patch(self, request, user_id):
+        cart = self.get_object(user_id)
+        data = request.data if 'operations' in request.data else {'operations': [request.data]}
+        serializer = CartOperationsSerializer(data=data)
+        if serializer.is_valid():
+            cart.apply_operations(serializer.validated_data['operations'])
+            items = CartItemSerializer(CartItem.objects.filter(cart=cart, product__deleted_at__isnull=True), many=True)
+            return Response({'id': cart.id, 'items': items.data}, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 
 class CategoryCreateAPIView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -160,21 +201,11 @@ class CategoryCreateAPIView(APIView):
 
 class DashboardProduct(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'product_dashboard'
 
     def get(self, request):
-        product_count = Product.objects.count()
-        category_count = Category.objects.count()
-        average_price = Product.objects.aggregate(avg_price=Avg('price'))
-        total_price = Product.objects.aggregate(sum_price=Sum('price'))
-        category_price = Category.objects.annotate(product_count=Count('product'), avg_price=Avg('product__price'))
-        categories = [{'id': category.id, 'name': category.name, 'product_count': category.product_count, 'сategory_price': category.avg_price} for category in category_price]
-        data = {
-            'average_price': average_price['avg_price'],
-            'product_count': product_count,
-            'category_count': category_count,
-            'total_price': total_price['sum_price'],
-            'categories': categories,
-        }
+        data = get_or_compute(PRODUCT_DASHBOARD_KEY, build_product_dashboard, settings.DASHBOARD_CACHE_TIMEOUT)
         return Response(data)
 
 
@@ -188,15 +219,12 @@ class CreateCheckoutSession(APIView):
         except Customer.DoesNotExist:
             return Response({'error': 'Customer not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        if customer.referral_code_other is not None and customer.referral_code_other != 0:
-            discount = 500
-        elif customer.referral_customer != 0:
-            discount = 500
-        else:
-            discount = 0
+        referral_code_other = customer.referral_code_other
+        claimed = customer.claim_referral_discount()
+        discount = 500 if claimed else 0
 
-        checkout_session = stripe.checkout.Session.create(
-            line_items=[{
+        if discount > 0:
+            line_items = [{
                 'price_data': {
                     'currency': 'usd',
                     'product_data': {
@@ -205,47 +233,43 @@ class CreateCheckoutSession(APIView):
                     'unit_amount': product.price - discount
                 },
                 'quantity': 1
-            }],
-            mode='payment',
-            success_url='https://example.com/checkout/success/',
-            cancel_url='https://example.com/checkout/failed/',
-        )
+            }]
+        else:
+            line_items = checkout_line_items([
+                {'product': product.id, 'name': product.name, 'unit_price': product.price, 'quantity': 1},
+            ])
 
-        if discount > 0:
-            if customer.referral_customer != 0:
-                customer.referral_customer -= 1
-                customer.save()
-            else:
-                customer.referral_code_other = 0
-                customer.save()
+        try:
+            checkout_session = stripe_client().checkout.Session.create(
+                line_items=line_items,
+                mode='payment',
+                success_url='https://example.com/checkout/success/',
+                cancel_url='https://example.com/checkout/failed/',
+            )
+        except Exception:
+            if claimed:
+                customer.release_referral_discount(claimed, referral_code_other)
+            raise
 
         return Response(checkout_session.url, status=status.HTTP_303_SEE_OTHER)
 
 
 class CreateCheckoutSessionCart(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'checkout'
 
     def get_object(self, id):
         try:
             return Cart.objects.get(customer_id=id)
-        except Product.DoesNotExist:
+        except Cart.DoesNotExist:
             raise Http404
 
     def post(self, request, id):
         cart = self.get_object(id)
-        line_items = []
-        for product in cart.product.all():
-            line_items.append({
-                'price_data': {
-                    'currency': 'usd',
-                    'product_data': {
-                        'name': product.name,
-                    },
-                    'unit_amount': product.price
-                },
-                'quantity': 1
-            })
-        checkout_session = stripe.checkout.Session.create(
+        # Same cached pricing snapshot the cart page showed, as synced Stripe prices.
+        line_items = checkout_line_items(get_cart_summary(cart.id)['lines'])
+        checkout_session = stripe_client().checkout.Session.create(
             line_items=line_items,
             mode='payment',
             success_url='https://example.com/checkout/success/',
@@ -255,10 +279,106 @@ class CreateCheckoutSessionCart(APIView):
 
 
 class ProductCommentView(APIView):
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'comments'
+
     def post(self, request, product_id):
         product = Product.objects.get(id=product_id)
         serializer = CommentSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(product=product)
+            with transaction.atomic():
+                serializer.save(product=product)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class CatalogSnapshotView(View):
+    # Serves the files written by build_catalog_snapshot as they are, picking
+    # the precompressed variant the client accepts.
+
+    def get(self, request, category_id=None, page=None):
+        if category_id is None:
+            path = snapshot_dir() / 'manifest.json'
+        else:
+            path = shard_path(category_id, page)
+        path, encoding = find_variant(path, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if path is None:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+        stat = path.stat()
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(path.read_bytes(), content_type='application/json')
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = f'public, max-age={settings.CATALOG_SNAPSHOT_MAX_AGE}'
+        return response
+
+
+class ProductChangesAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            since = parse_cursor(request.query_params.get('since'))
+            limit = min(max(1, int(request.query_params.get('limit', settings.PRODUCT_CHANGES_BATCH))), 1000)
+        except ValueError:
+            return Response({'detail': 'since must be a cursor and limit an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        if START < since < horizon():
+            return Response({'detail': 'Cursor is too old, sync again from since=0.'}, status=status.HTTP_410_GONE)
+        return Response(changes_since(since, limit), status=status.HTTP_200_OK)
+
+
+class ProductSuggestAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', settings.AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(1, limit), settings.AUTOCOMPLETE_PREFIX_LIMIT)
+        results = suggest(query, limit)
+        if results is None:
+            # No Redis index (e.g. local cache backend): plain prefix match on the name.
+            results = list(Product.objects.filter(name__istartswith=query.strip()).order_by('name').values('id', 'name')[:limit])
+        return Response({'query': query, 'results': results}, status=status.HTTP_200_OK)
+
+
+class ProductRecommendationsAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, id):
+        neighbours = ProductRecommendation.objects.filter(product_id=id).values_list('neighbours', flat=True).first()
+        scores = dict(neighbours or [])
+        products = sorted(Product.objects.filter(id__in=scores), key=lambda product: (-scores[product.id], product.id))
+        data = ProductSerializer(products, many=True, context={'categories': get_categories()}).data
+        for item in data:
+            item['score'] = scores[item['id']]
+        return Response({'product': id, 'results': data}, status=status.HTTP_200_OK)
+
+
+class CommentActivityAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'comment_activity'
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', 30))
+            end = request.query_params.get('end')
+            end = datetime.date.fromisoformat(end) if end else timezone.localdate()
+            product_id = request.query_params.get('product')
+            vendor_id = request.query_params.get('vendor')
+            product_id = int(product_id) if product_id else None
+            vendor_id = int(vendor_id) if vendor_id else None
+        except ValueError:
+            return Response({'detail': 'Invalid days, end, product or vendor.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= 366:
+            return Response({'detail': 'days must be between 1 and 366.'}, status=status.HTTP_400_BAD_REQUEST)
+        start = end - datetime.timedelta(days=days - 1)
+        return Response(comment_activity(start, end, product_id, vendor_id), status=status.HTTP_200_OK)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from core.async_views import AsyncAPIView
+from core.cache import arecord_access
+from product.cache import aget_categories
+from .cache import vendor_detail_key, vendor_products, vendor_products_page, vendor_stats
+from .models import Vendor, VendorStats
+from .pagination import parse_cursor, with_page_links
+from .serializers import VendorRegisterSerializer
+
+
+class VendorDetailAPIView(AsyncAPIView):
+
+    async def build(self, id, cursor):
+        try:
+            snippet = await Vendor.objects.aget(id=id)
+        except Vendor.DoesNotExist:
+            raise Http404
+        products = [product async for product in vendor_products(id, cursor)]
+        data = dict(VendorRegisterSerializer(snippet).data)
+        data['stats'] = vendor_stats(await VendorStats.objects.filter(vendor_id=id).afirst())
+        data['products'] = vendor_products_page(products, await aget_categories())
+        return data
+
+    async def get(self, request, id):
+        await arecord_access('vendor', id)
+        cursor = parse_cursor(request)
+        if cursor is not None:
+            data = await self.build(id, cursor)
+        else:
+            data = await cache.aget(vendor_detail_key(id))
+            if data is None:
+                data = await self.build(id, None)
+                await cache.aset(vendor_detail_key(id), data, settings.VENDOR_DETAIL_CACHE_TIMEOUT)
+        return self.response(with_page_links(request, data))
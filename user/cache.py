@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+
+USER_DASHBOARD_KEY = 'user:dashboard'
+
+
+def build_user_dashboard():
+    from .models import Vendor, Customer
+
+    customer_count = Customer.objects.count()
+    vendor_count = Vendor.objects.count()
+    # Soft-deleted products of live vendors still join here.
+    live_products = Count('product', filter=Q(product__deleted_at__isnull=True))
+    avg_count_vendor_product = Vendor.objects.annotate(num_products=live_products).aggregate(avg_count=Avg('num_products'))
+    vendors = Vendor.objects.annotate(sum_products=live_products)
+    vendor_product_count = [{'id': v.id, 'name': v.name, 'product_count': v.sum_products} for v in vendors]
+    customers = Customer.objects.annotate(avg_cart_products=Count('cart'), count_product_cart=Count('cart__product'))
+    customers_count_count = [{'id': v.id, 'name': v.name, 'product_count': v.avg_cart_products} for v in customers]
+
+    return {
+        'customer_count': customer_count,
+        'vendor_count': vendor_count,
+        'avg_count_vendor_product': avg_count_vendor_product['avg_count'],
+        'vendors': vendor_product_count,
+        'customers': customers_count_count
+    }
+
+
+def vendor_detail_key(vendor_id):
+    return f'vendor:{vendor_id}:detail'
+
+
+def vendor_products(vendor_id, cursor=None):
+    # Keyset pagination over (vendor, -id): every page is an index range scan,
+    # however deep the cursor is.
+    from product.models import Product
+
+    queryset = Product.objects.filter(vendor_id=vendor_id).order_by('-id')
+    if cursor is not None:
+        queryset = queryset.filter(id__lt=cursor)
+    return queryset[:settings.VENDOR_PRODUCTS_PAGE_SIZE + 1]
+
+
+def vendor_products_page(products, categories=None):
+    from product.serializers import ProductSerializer
+
+    products = list(products)
+    size = settings.VENDOR_PRODUCTS_PAGE_SIZE
+    context = {'categories': categories} if categories is not None else {}
+    return {
+        'next_cursor': products[size - 1].id if len(products) > size else None,
+        'results': list(ProductSerializer(products[:size], many=True, context=context).data),
+    }
+
+
+def vendor_stats(stats):
+    if stats is None:
+        return {'product_count': 0, 'min_price': None, 'max_price': None}
+    return {'product_count': stats.product_count, 'min_price': stats.min_price, 'max_price': stats.max_price}
+
+
+def build_vendor_detail(vendor, cursor=None):
+    from .models import VendorStats
+    from .serializers import VendorRegisterSerializer
+
+    data = dict(VendorRegisterSerializer(vendor).data)
+    data['stats'] = vendor_stats(VendorStats.objects.filter(vendor_id=vendor.id).first())
+    data['products'] = vendor_products_page(vendor_products(vendor.id, cursor))
+    return data
+
+
+def warm_vendor_detail(vendor_id):
+    from .models import Vendor
+
+    vendor = Vendor.objects.filter(id=vendor_id).first()
+    if vendor is None:
+        return None
+    data = build_vendor_detail(vendor)
+    cache.set(vendor_detail_key(vendor_id), data, settings.VENDOR_DETAIL_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_vendor_detail(vendor_id):
+    cache.delete(vendor_detail_key(vendor_id))
+
+
+def refresh_vendor(vendor_id):
+    from .models import VendorStats
+
+    VendorStats.refresh(vendor_id)
+    invalidate_vendor_detail(vendor_id)
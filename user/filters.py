@@ -1,5 +1,15 @@
+import operator
+from functools import reduce
+
 import django_filters
-from .models import Vendor
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Greatest, Upper
+from rest_framework import filters
+
+from .models import Vendor, Customer
 
 
 class VendorFilter(django_filters.FilterSet):
@@ -9,3 +19,39 @@ class VendorFilter(django_filters.FilterSet):
     class Meta:
         model = Vendor
         fields = ['name', 'second_name']
+
+
+class CustomerFilter(django_filters.FilterSet):
+    name = django_filters.CharFilter(lookup_expr='icontains')
+    second_name = django_filters.CharFilter(lookup_expr='icontains')
+
+    class Meta:
+        model = Customer
+        fields = ['name', 'second_name']
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    # ?search= keeps the SearchFilter substring semantics; on Postgres its
+    # UPPER(col) LIKE UPPER('%term%') lookups are answered by the gin_trgm_ops
+    # indexes on UPPER(col). ?search=...&fuzzy=1 also matches by trigram
+    # similarity, on the same indexed expression, so typos still match, and
+    # orders the results by the best similarity over search_fields.
+    fuzzy_param = 'fuzzy'
+
+    def filter_queryset(self, request, queryset, view):
+        if request.query_params.get(self.fuzzy_param) != '1' or connection.vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        search_fields = self.get_search_fields(view, request)
+        term = ' '.join(self.get_search_terms(request))
+        if not search_fields or not term:
+            return queryset
+
+        similarities = [TrigramSimilarity(field, term) for field in search_fields]
+        condition = reduce(operator.or_, [
+            Q(TrigramSimilar(Upper(field), term.upper())) | Q(**{f'{field}__icontains': term})
+            for field in search_fields
+        ])
+        return queryset.filter(condition).annotate(
+            search_rank=Greatest(*similarities) if len(similarities) > 1 else similarities[0],
+        ).order_by('-search_rank', 'pk')
@@ -0,0 +1,113 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from user.models import CustomUser, Customer
+from user.views import CustomerList
+
+BENCH_DOMAIN = 'bench.invalid'
+FIRST_NAMES = [
+    'Aleksandr', 'Anastasia', 'Dmitry', 'Ekaterina', 'Ivan', 'Maria', 'Nikolai', 'Olga', 'Pavel', 'Svetlana',
+    'Sergei', 'Tatiana', 'Viktor', 'Yulia', 'Mikhail', 'Natalia', 'Andrei', 'Irina', 'Kirill', 'Polina',
+]
+LAST_NAMES = [
+    'Ivanov', 'Smirnov', 'Kuznetsov', 'Popov', 'Vasiliev', 'Petrov', 'Sokolov', 'Mikhailov', 'Novikov', 'Fedorov',
+    'Morozov', 'Volkov', 'Alekseev', 'Lebedev', 'Semenov', 'Egorov', 'Pavlov', 'Kozlov', 'Stepanov', 'Nikolaev',
+]
+SUBSTRING_TERMS = ['kuznets', 'olkov', 'user4242', '5550123', 'anastas']
+FUZZY_TERMS = ['Kuznetzov', 'Smirnof', 'Vasilyev', 'Ekaterna', 'Lebedeff']
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic customers and compare the previous ILIKE search (forced sequential scan) '
+        'with the trigram-indexed substring and fuzzy search modes of CustomerList. Postgres only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--cleanup', action='store_true', help='Delete the synthetic customers and exit')
+
+    def seed(self, total):
+        existing = CustomUser.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').count()
+        if existing >= total:
+            return
+        user_table = connection.ops.quote_name(CustomUser._meta.db_table)
+        customer_table = connection.ops.quote_name(Customer._meta.db_table)
+        batch = 100_000
+        for start in range(existing, total, batch):
+            stop = min(start + batch, total)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'''
+                    INSERT INTO {user_table}
+                        (password, is_superuser, email, is_active, is_admin, is_staff, "is_Vendor")
+                    SELECT '!', false, 'user' || i || '@{BENCH_DOMAIN}', true, false, false, false
+                    FROM generate_series(%s, %s) AS i
+                ''', [start, stop - 1])
+                cursor.execute(f'''
+                    INSERT INTO {customer_table}
+                        (customuser_ptr_id, name, second_name, phone_number, card_number, address, post_code,
+                         referral_customer)
+                    SELECT u.id, (%s::text[])[1 + u.id %% %s], (%s::text[])[1 + (u.id / 7) %% %s],
+                           '+7' || lpad((u.id::bigint * 7919 %% 10000000000)::text, 10, '0'), '4242424242424242',
+                           'Synthetic street ' || u.id, lpad((u.id %% 1000000)::text, 6, '0'), 0
+                    FROM {user_table} u
+                    WHERE u.email LIKE %s AND NOT EXISTS (
+                        SELECT 1 FROM {customer_table} c WHERE c.customuser_ptr_id = u.id
+                    )
+                ''', [FIRST_NAMES, len(FIRST_NAMES), LAST_NAMES, len(LAST_NAMES), f'%@{BENCH_DOMAIN}'])
+            self.stdout.write(f'seeded {stop} users')
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {user_table}')
+            cursor.execute(f'ANALYZE {customer_table}')
+
+    def cleanup(self):
+        with transaction.atomic():
+            users = CustomUser.objects.filter(email__endswith=f'@{BENCH_DOMAIN}')
+            Customer.objects.filter(customuser_ptr__in=users).delete()
+            deleted, _ = users.delete()
+        self.stdout.write(f'Deleted {deleted} synthetic rows')
+
+    def run_query(self, view, user, params, seqscan):
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, user=user)
+        with transaction.atomic():
+            if seqscan:
+                # Without the trigram indexes the ILIKE filter could only scan.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_bitmapscan = off')
+                    cursor.execute('SET LOCAL enable_indexscan = off')
+            started = time.perf_counter()
+            response = view(request)
+            elapsed = time.perf_counter() - started
+        return elapsed, response.data['count']
+
+    def bench(self, label, terms, extra, seqscan, repeat):
+        view = CustomerList.as_view()
+        user = CustomUser(email='bench@example.com')
+        timings, matches = [], 0
+        for term in terms:
+            params = {'search': term, 'limit': 20, **extra}
+            self.run_query(view, user, params, seqscan)
+            for _ in range(repeat):
+                elapsed, matches = self.run_query(view, user, params, seqscan)
+                timings.append(elapsed * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'{label:<22} mean={statistics.mean(timings):8.1f}ms p50={timings[len(timings) // 2]:8.1f}ms '
+            f'max={timings[-1]:8.1f}ms last_matches={matches}'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The trigram benchmark needs PostgreSQL with pg_trgm')
+        if options['cleanup']:
+            return self.cleanup()
+        self.seed(options['users'])
+        self.bench('ilike (seq scan)', SUBSTRING_TERMS, {}, True, options['repeat'])
+        self.bench('substring (trigram)', SUBSTRING_TERMS, {}, False, options['repeat'])
+        self.bench('fuzzy (similarity)', FUZZY_TERMS, {'fuzzy': 1}, False, options['repeat'])
@@ -0,0 +1,186 @@
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models.functions import Lower
+
+from product.models import Cart
+from user.models import CustomUser, Customer
+
+REQUIRED_FIELDS = ['email', 'password', 'name', 'second_name', 'phone_number', 'card_number', 'address', 'post_code']
+REFERRAL_CODES = range(100000, 1000000)
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import customers from a CSV or NDJSON file (or "-" for stdin). '
+        'Rows need the fields of the customer registration form; an optional '
+        'referral_code is kept when it is free. Passwords are hashed in a process pool '
+        'and users, customers and carts are inserted in chunks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    def read_rows(self, source, fmt):
+        if fmt == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+    def chunks(self, rows, size):
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                return
+            yield chunk
+
+    def prepare(self, chunk):
+        # Drops invalid rows and emails that already exist (in the database or
+        # earlier in the input) and assigns each customer a free referral code.
+        rows = []
+        for row in chunk:
+            if any(not row.get(field) for field in REQUIRED_FIELDS):
+                self.invalid += 1
+                continue
+            row['email'] = CustomUser.objects.normalize_email(row['email'].strip())
+            if row['email'].lower() in self.seen_emails:
+                self.duplicates += 1
+                continue
+            self.seen_emails.add(row['email'].lower())
+            rows.append(row)
+
+        existing = set(
+            CustomUser.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=[row['email'].lower() for row in rows])
+            .values_list('email_lower', flat=True)
+        )
+        prepared = []
+        for row in rows:
+            if row['email'].lower() in existing:
+                self.duplicates += 1
+                continue
+            row['referral_code'] = self.referral_code(row.get('referral_code'))
+            prepared.append(row)
+        return prepared
+
+    def referral_code(self, wanted):
+        try:
+            wanted = int(wanted)
+        except (TypeError, ValueError):
+            wanted = None
+        if wanted is not None and wanted not in self.used_codes:
+            self.used_codes.add(wanted)
+            return wanted
+        if len(self.used_codes) >= len(REFERRAL_CODES):
+            raise CommandError('No free referral codes left')
+        code = random.choice(REFERRAL_CODES)
+        while code in self.used_codes:
+            code = random.choice(REFERRAL_CODES)
+        self.used_codes.add(code)
+        return code
+
+    def insert(self, rows, hashes):
+        # bulk_create() refuses multi-table inheritance models, so the parent
+        # rows go through bulk_create() and the customer rows are written
+        # straight into the child table.
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=row['email'], password=password, is_Vendor=False)
+            for row, password in zip(rows, hashes)
+        ])
+        customers = [
+            Customer(
+                customuser_ptr_id=user.pk,
+                name=row['name'],
+                second_name=row['second_name'],
+                phone_number=row['phone_number'],
+                card_number=row['card_number'],
+                address=row['address'],
+                post_code=row['post_code'],
+                referral_code=row['referral_code'],
+                referral_code_other=None,
+                referral_customer=0,
+            )
+            for row, user in zip(rows, users)
+        ]
+        fields = Customer._meta.local_concrete_fields
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(Customer._meta.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                [field.get_db_prep_save(getattr(customer, field.attname), connection) for field in fields]
+                for customer in customers
+            ])
+        Cart.objects.bulk_create([Cart(customer_id=user.pk) for user in users])
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError(f'{connection.vendor} does not return ids from bulk inserts')
+        fmt = options['format'] or ('ndjson' if options['path'].endswith(('.ndjson', '.jsonl')) else 'csv')
+        if options['path'] == '-':
+            source = sys.stdin
+        else:
+            try:
+                source = open(options['path'], newline='', encoding='utf-8')
+            except OSError as exc:
+                raise CommandError(f'Could not read {options["path"]}: {exc}')
+
+        self.invalid = self.duplicates = imported = 0
+        self.seen_emails = set()
+        self.used_codes = set(Customer.objects.exclude(referral_code=None).values_list('referral_code', flat=True))
+        started = time.perf_counter()
+
+        with source, ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+            def hash_passwords(rows):
+                passwords = [row['password'] for row in rows]
+                chunksize = max(1, len(passwords) // (options['workers'] * 4))
+                return executor.map(make_password, passwords, chunksize=chunksize)
+
+            # Hashing of the next chunk is already running in the pool while
+            # the current one is being inserted.
+            pending = None
+            for chunk in self.chunks(self.read_rows(source, fmt), options['chunk_size']):
+                rows = self.prepare(chunk)
+                if not rows:
+                    continue
+                current, pending = pending, (rows, hash_passwords(rows))
+                if current:
+                    imported += self.flush(*current, imported, started)
+            if pending:
+                imported += self.flush(*pending, imported, started)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} customers in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:.0f}/s), '
+            f'skipped {self.duplicates} duplicates and {self.invalid} invalid rows'
+        ))
+
+    def flush(self, rows, hashes, imported, started):
+        hashes = list(hashes)
+        try:
+            with transaction.atomic():
+                self.insert(rows, hashes)
+        except IntegrityError as exc:
+            raise CommandError(f'Chunk starting at {rows[0]["email"]} could not be inserted: {exc}')
+        imported += len(rows)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{imported} imported, {imported / elapsed:.0f}/s')
+        return len(rows)
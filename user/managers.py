@@ -23,3 +23,9 @@ class CustomUserManager(BaseUserManager):
         if extra_fields.get('is_superuser') is not True:
             raise ValueError(_('Superuser must have is_superuser = True'))
         return self.create_user(email, password, **extra_fields)
+
+
+class VendorManager(CustomUserManager):
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
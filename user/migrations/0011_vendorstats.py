@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-19 19:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Min
+
+
+def backfill_vendor_stats(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    VendorStats = apps.get_model('user', 'VendorStats')
+    rows = Product.objects.order_by().values('vendor_id').annotate(
+        product_count=Count('id'), min_price=Min('price'), max_price=Max('price'),
+    )
+    VendorStats.objects.bulk_create([VendorStats(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0010_customer_referral_customer'),
+        ('product', '0011_product_vendor_recent_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorStats',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='user.vendor')),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('min_price', models.IntegerField(null=True)),
+                ('max_price', models.IntegerField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_vendor_stats, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
-from .managers import CustomUserManager
+from django.utils import timezone
+from .managers import CustomUserManager, VendorManager
 
 
 class CustomUser(AbstractBaseUser, PermissionsMixin):
@@ -20,6 +24,11 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='user_email_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -29,10 +38,71 @@ class Vendor(CustomUser):
     second_name = models.CharField(max_length=255, null=False, blank=False)
     phone_number = models.CharField(max_length=255, null=False, blank=False)
     description = models.CharField(max_length=255, null=False, blank=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = VendorManager()
+    all_objects = CustomUserManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='vendor_name_trgm_idx'),
+            GinIndex(OpClass(Upper('second_name'), name='gin_trgm_ops'), name='vendor_second_name_trgm_idx'),
+            GinIndex(OpClass(Upper('phone_number'), name='gin_trgm_ops'), name='vendor_phone_trgm_idx'),
+            models.Index(fields=['deleted_at'], name='vendor_deleted_idx', condition=Q(deleted_at__isnull=False)),
+        ]
 
     def __str__(self):
         return self.email
 
+    def soft_delete(self):
+        # Hides the vendor and its products right away and locks the account;
+        # the rows themselves are removed later by the purge job.
+        from product.autocomplete import unindex_products
+        from product.cache import invalidate_cart_summaries, invalidate_product_details
+        from product.changes import record_deletes
+        from product.facets import invalidate_facets
+        from product.models import Product
+        from product.snapshots import mark_dirty
+
+        now = timezone.now()
+        with transaction.atomic():
+            self.deleted_at = now
+            self.is_active = False
+            self.save(update_fields=['deleted_at', 'is_active'])
+            Product.objects.filter(vendor_id=self.id).update(deleted_at=now)
+            hidden = Product.all_objects.filter(vendor_id=self.id, deleted_at=now)
+            names = dict(hidden.values_list('id', 'name'))
+            product_ids = list(names)
+            category_ids = list(hidden.order_by().values_list('category_id', flat=True).distinct())
+            record_deletes(product_ids)
+            transaction.on_commit(invalidate_facets)
+            transaction.on_commit(lambda: mark_dirty(*category_ids))
+            transaction.on_commit(lambda: invalidate_product_details(product_ids))
+            transaction.on_commit(lambda: invalidate_cart_summaries(product_ids))
+            transaction.on_commit(lambda: unindex_products(names))
+
+
+class VendorStats(models.Model):
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    product_count = models.PositiveIntegerField(default=0)
+    min_price = models.IntegerField(null=True)
+    max_price = models.IntegerField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def refresh(cls, vendor_id):
+        from product.models import Product
+
+        if not Vendor.objects.filter(id=vendor_id).exists():
+            return None
+        stats = Product.objects.filter(vendor_id=vendor_id).aggregate(
+            product_count=Count('id'), min_price=Min('price'), max_price=Max('price'),
+        )
+        return cls.objects.update_or_create(vendor_id=vendor_id, defaults=stats)[0]
+
+    def __str__(self):
+        return str(self.vendor_id)
+
 
 class Customer(CustomUser):
     name = models.CharField(max_length=255, null=False, blank=False)
@@ -45,9 +115,34 @@ class Customer(CustomUser):
     referral_code_other = models.IntegerField(null=True)
     referral_customer = models.IntegerField(default=0, null=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='customer_name_trgm_idx'),
+            GinIndex(OpClass(Upper('second_name'), name='gin_trgm_ops'), name='customer_second_name_trgm_idx'),
+            GinIndex(OpClass(Upper('phone_number'), name='gin_trgm_ops'), name='customer_phone_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.email
 
+    def claim_referral_discount(self):
+        # One conditional UPDATE per source, so concurrent checkouts can never
+        # spend the same discount twice. Returns what was claimed, or None.
+        customers = Customer.objects.filter(pk=self.pk)
+        if customers.filter(referral_customer__gt=0).update(referral_customer=F('referral_customer') - 1):
+            return 'referral_customer'
+        if customers.filter(referral_code_other__isnull=False).exclude(referral_code_other=0).update(referral_code_other=0):
+            return 'referral_code_other'
+        return None
+
+    def release_referral_discount(self, claimed, referral_code_other=None):
+        # Gives back a discount taken by claim_referral_discount when the checkout failed.
+        customers = Customer.objects.filter(pk=self.pk)
+        if claimed == 'referral_customer':
+            customers.update(referral_customer=F('referral_customer') + 1)
+        elif claimed == 'referral_code_other':
+            customers.filter(referral_code_other=0).update(referral_code_other=referral_code_other)
+
 
 class Referral(models.Model):
     customer = models.ManyToManyField(Customer, related_name='referrals')
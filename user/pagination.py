@@ -0,0 +1,20 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+
+def parse_cursor(request):
+    cursor = request.GET.get('cursor')
+    if not cursor:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise NotFound('Invalid cursor')
+
+
+def with_page_links(request, data):
+    # The cached payload only carries the cursor; links depend on the request URL.
+    products = dict(data['products'])
+    cursor = products.pop('next_cursor')
+    products['next'] = replace_query_param(request.build_absolute_uri(), 'cursor', cursor) if cursor else None
+    return {**data, 'products': products}
@@ -1,35 +1,35 @@
+from django.conf import settings
 from django.urls import path
-from .views import (
-    LoginView,
-    VendorRegisterView,
-    CustomerRegisterView,
-    VendorList,
-    VendorProfileAPIView,
-    VendorDetailAPIView,
-    CustomerList,
-    DashboardUser,
-    ReferralDetailAPIView,
-    AddToReferralAPIView,
-    AddReferralCodeOtherAPIView,
-    ShowCustomerReferralAPIView,
-)
+
+from core.lazy import lazy_view
+
+
+def view(name):
+    return lazy_view(f'user.views.{name}')
+
+
+def read_view(name):
+    if settings.ASYNC_READ_VIEWS:
+        return lazy_view(f'user.async_views.{name}', asynchronous=True)
+    return view(name)
+
 
 urlpatterns = [
-    path('login/', LoginView.as_view(), name='login'),
-    path('vendor/register/', VendorRegisterView.as_view(), name='vendor-register'),
-    path('customer/register/', CustomerRegisterView.as_view(), name='customer-register'),
+    path('login/', view('LoginView'), name='login'),
+    path('vendor/register/', view('VendorRegisterView'), name='vendor-register'),
+    path('customer/register/', view('CustomerRegisterView'), name='customer-register'),
 
-    path('vendor/list/', VendorList.as_view(), name='vendor-list'),
-    path('customer/list/', CustomerList.as_view(), name='customer-list'),
+    path('vendor/list/', view('VendorList'), name='vendor-list'),
+    path('customer/list/', view('CustomerList'), name='customer-list'),
 
-    path('vendor/profile/<str:token>/', VendorProfileAPIView.as_view(), name='vendor-profile'),
+    path('vendor/profile/<str:token>/', view('VendorProfileAPIView'), name='vendor-profile'),
 
-    path('vendor/detail/<int:id>/', VendorDetailAPIView.as_view(), name='vendor-detail'),
+    path('vendor/detail/<int:id>/', read_view('VendorDetailAPIView'), name='vendor-detail'),
 
-    path('dashboard/', DashboardUser.as_view(), name='user-dashboard'),
+    path('dashboard/', view('DashboardUser'), name='user-dashboard'),
 
-    path('referral-info/<int:id>/', ReferralDetailAPIView.as_view(), name='referral-info'),
-    path('referral-add/<int:user_id>/', AddToReferralAPIView.as_view(), name='referral-add'),
-    path('referral-add-boom/<int:id>/', AddReferralCodeOtherAPIView.as_view(), name='referral-add-boom'),
-    path('refer/<int:id>/', ShowCustomerReferralAPIView.as_view(), name='referral-add-boom')
+    path('referral-info/<int:id>/', view('ReferralDetailAPIView'), name='referral-info'),
+    path('referral-add/<int:user_id>/', view('AddToReferralAPIView'), name='referral-add'),
+    path('referral-add-boom/<int:id>/', view('AddReferralCodeOtherAPIView'), name='referral-add-boom'),
+    path('refer/<int:id>/', view('ShowCustomerReferralAPIView'), name='referral-add-boom')
 ]
@@ -1,7 +1,8 @@
 import random
 
+from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Count, Avg
+from django.db import transaction
 from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, filters, generics
@@ -12,12 +13,18 @@ import jwt
 from ananas.settings import SECRET_KEY
 from rest_framework_simplejwt import exceptions
 
-from .models import Vendor, Customer, Referral
+from .models import Vendor, Customer, Referral, VendorStats
+from core.cache import record_access, get_or_compute
+from core.throttling import TokenBucketThrottle
+from .cache import USER_DASHBOARD_KEY, build_user_dashboard, vendor_detail_key, build_vendor_detail, vendor_products, \
+    vendor_products_page, vendor_stats
+from .filters import VendorFilter, CustomerFilter, TrigramSearchFilter
+from .pagination import parse_cursor, with_page_links
 from .permissions import AnonPermissionOnly
 from .serializers import MyTokenObtainPairSerializer, VendorRegisterSerializer, CustomerRegisterSerializer, \
     VendorProfileSerializer, ReferralSerializer, ReferralCodeSerializer
-from product.models import Product, Cart
-from product.serializers import ProductSerializer
+from product.jobs import purge_deleted_rows
+from product.models import Cart
 
 
 def decode_auth_token(token):
@@ -71,23 +78,21 @@ class CustomerRegisterView(APIView):
             while Customer.objects.filter(referral_code=referral_code).exists():
                 referral_code = random.randint(100000, 999999)
 
-            customer = Customer.objects.create(
-                email=request.data['email'],
-                name=request.data['name'],
-                second_name=request.data['second_name'],
-                phone_number=request.data['phone_number'],
-                card_number=request.data['card_number'],
-                address=request.data['address'],
-                post_code=request.data['post_code'],
-                is_Vendor=False,
-                referral_code=referral_code
-            )
-            customer.set_password(request.data['password'])
-            customer.save()
-            cart = Cart.objects.create(
-                customer=customer
-            )
-            cart.save()
+            with transaction.atomic():
+                customer = Customer.objects.create(
+                    email=request.data['email'],
+                    name=request.data['name'],
+                    second_name=request.data['second_name'],
+                    phone_number=request.data['phone_number'],
+                    card_number=request.data['card_number'],
+                    address=request.data['address'],
+                    post_code=request.data['post_code'],
+                    is_Vendor=False,
+                    referral_code=referral_code
+                )
+                customer.set_password(request.data['password'])
+                customer.save()
+                Cart.objects.create(customer=customer)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -95,18 +100,18 @@ class CustomerRegisterView(APIView):
 class VendorList(generics.ListAPIView):
     queryset = Vendor.objects.all()
     serializer_class = VendorRegisterSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['name', 'second_name']
-    search_fields = ['name', 'second_name']
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter, filters.OrderingFilter]
+    filterset_class = VendorFilter
+    search_fields = ['name', 'second_name', 'email', 'phone_number']
     ordering_fields = '__all__'
 
 
 class CustomerList(generics.ListAPIView):
     queryset = Customer.objects.all()
     serializer_class = CustomerRegisterSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['name', 'second_name']
-    search_fields = ['name', 'second_name']
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter, filters.OrderingFilter]
+    filterset_class = CustomerFilter
+    search_fields = ['name', 'second_name', 'email', 'phone_number']
     ordering_fields = '__all__'
 
 
@@ -130,12 +135,11 @@ class VendorProfileAPIView(APIView):
 
     def get(self, request, token):
         snippet = self.get_object(token)
-        products = Product.objects.filter(vendor=snippet)
         serializer = VendorProfileSerializer(snippet)
-        serializer2 = ProductSerializer(products, many=True)
         data = serializer.data
-        data['products'] = serializer2.data
-        return Response(data, status=status.HTTP_200_OK)
+        data['stats'] = vendor_stats(VendorStats.objects.filter(vendor_id=snippet.id).first())
+        data['products'] = vendor_products_page(vendor_products(snippet.id, parse_cursor(request)))
+        return Response(with_page_links(request, data), status=status.HTTP_200_OK)
 
     def put(self, request, token):
         snippet = self.get_object(token)
@@ -149,7 +153,8 @@ class VendorProfileAPIView(APIView):
     def delete(self, request, token):
         snippet = self.get_object(token)
         cache.delete(token)
-        snippet.delete()
+        snippet.soft_delete()
+        purge_deleted_rows.delay()
         return Response(status.HTTP_204_NO_CONTENT)
 
 
@@ -163,34 +168,25 @@ class VendorDetailAPIView(APIView):
             raise Http404
 
     def get(self, request, id):
-        snippet = self.get_object(id)
-        products = Product.objects.filter(vendor_id=id)
-        serializer = VendorRegisterSerializer(snippet)
-        serializer2 = ProductSerializer(products, many=True)
-        data = serializer.data
-        data['products'] = serializer2.data
-        return Response(data, status=status.HTTP_200_OK)
+        record_access('vendor', id)
+        cursor = parse_cursor(request)
+        if cursor is not None:
+            data = build_vendor_detail(self.get_object(id), cursor)
+        else:
+            data = cache.get(vendor_detail_key(id))
+            if data is None:
+                data = build_vendor_detail(self.get_object(id))
+                cache.set(vendor_detail_key(id), data, settings.VENDOR_DETAIL_CACHE_TIMEOUT)
+        return Response(with_page_links(request, data), status=status.HTTP_200_OK)
 
 
 class DashboardUser(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'user_dashboard'
 
     def get(self, request):
-        customer_count = Customer.objects.count()
-        vendor_count = Vendor.objects.count()
-        avg_count_vendor_product = Vendor.objects.annotate(num_products=Count('product')).aggregate(avg_count=Avg('num_products'))
-        vendors = Vendor.objects.annotate(sum_products=Count('product'))
-        vendor_product_count = [{'id': v.id, 'name': v.name, 'product_count': v.sum_products} for v in vendors]
-        customers = Customer.objects.annotate(avg_cart_products=Count('cart'), count_product_cart=Count('cart__product'))
-        customers_count_count = [{'id': v.id, 'name': v.name, 'product_count': v.avg_cart_products} for v in customers]
-
-        data = {
-            'customer_count': customer_count,
-            'vendor_count': vendor_count,
-            'avg_count_vendor_product': avg_count_vendor_product['avg_count'],
-            'vendors': vendor_product_count,
-            'customers': customers_count_count
-        }
+        data = get_or_compute(USER_DASHBOARD_KEY, build_user_dashboard, settings.DASHBOARD_CACHE_TIMEOUT)
         return Response(data)
 
 